@@ -3,5 +3,28 @@ from django.contrib import admin
 
 from .models import ToDoItem, ToDoList
 
-admin.site.register(ToDoList)
-admin.site.register(ToDoItem)
+
+class ToDoListAdmin(admin.ModelAdmin):
+    """Admin for todo lists. Skips counting all records when showing filtered results"""
+
+    list_display = ("name", "description", "updated_at")
+    list_per_page = 50
+    show_full_result_count = False
+
+
+class ToDoItemAdmin(admin.ModelAdmin):
+    """
+    Admin for todo items. Skips counting all records when showing filtered results, and
+    orders items by todo list id and priority, which the index on them serves. Ordering by
+    the todo list itself would sort on its name through a join instead
+    """
+
+    list_display = ("name", "priority", "to_do_list")
+    list_select_related = ("to_do_list",)
+    list_per_page = 50
+    show_full_result_count = False
+    ordering = ("to_do_list_id", "priority")
+
+
+admin.site.register(ToDoList, ToDoListAdmin)
+admin.site.register(ToDoItem, ToDoItemAdmin)
@@ -0,0 +1,18 @@
+""" URL path converters for the todo list app """
+
+
+class NameConverter:
+    """
+    Match the name of a todo list or item. Names are slugs no longer than the name field
+    allows, so longer URL segments are rejected without looking up a record
+    """
+
+    regex = "[-a-zA-Z0-9_]{1,25}"
+
+    def to_python(self, value):
+        """Convert the matched URL segment to a name"""
+        return value
+
+    def to_url(self, value):
+        """Convert a name to a URL segment"""
+        return value
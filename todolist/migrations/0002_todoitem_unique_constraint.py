@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-14 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("todolist", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="todoitem",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="todoitem",
+            constraint=models.UniqueConstraint(
+                fields=("to_do_list", "priority"), name="uniq_list_priority"
+            ),
+        ),
+    ]
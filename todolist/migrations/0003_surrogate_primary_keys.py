@@ -0,0 +1,150 @@
+# Switch todo lists and items from using 'name' as the primary key to an integer
+# surrogate key, keeping 'name' unique. Changing a primary key referenced by a
+# foreign key in place is not portable across databases, so the data is copied
+# into new tables which then replace the originals.
+# Renaming the new tables only renames the tables themselves. On PostgreSQL their
+# indexes, constraints and id sequences keep names built from the "newtodolist" and
+# "newtodoitem" table names. Django looks these up by introspection rather than by
+# name, so later migrations are not affected.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_records(source_list, source_item, target_list, target_item):
+    """Copy all todo lists and items between two sets of tables"""
+    target_list.objects.bulk_create(
+        target_list(name=record.name, description=record.description)
+        for record in source_list.objects.all()
+    )
+    # Not every database returns primary keys from a bulk insert, so look them up
+    target_list_pks = dict(target_list.objects.values_list("name", "pk"))
+    target_item.objects.bulk_create(
+        target_item(
+            name=record.name,
+            description=record.description,
+            to_do_list_id=target_list_pks[record.to_do_list.name],
+            priority=record.priority,
+        )
+        for record in source_item.objects.select_related("to_do_list")
+    )
+
+    # Inserting the records reset the timestamps. Restore them in batched updates
+    for source, target in ((source_list, target_list), (source_item, target_item)):
+        timestamps = {
+            name: (created_at, updated_at)
+            for name, created_at, updated_at in source.objects.values_list(
+                "name", "created_at", "updated_at"
+            )
+        }
+        records = list(target.objects.only("pk", "name"))
+        for record in records:
+            record.created_at, record.updated_at = timestamps[record.name]
+        target.objects.bulk_update(
+            records, ["created_at", "updated_at"], batch_size=500
+        )
+
+
+def copy_to_new_tables(apps, schema_editor):
+    """Copy records from the tables keyed by name to the tables with surrogate keys"""
+    copy_records(
+        apps.get_model("todolist", "ToDoList"),
+        apps.get_model("todolist", "ToDoItem"),
+        apps.get_model("todolist", "NewToDoList"),
+        apps.get_model("todolist", "NewToDoItem"),
+    )
+
+
+def copy_to_old_tables(apps, schema_editor):
+    """Copy records from the tables with surrogate keys to the tables keyed by name"""
+    copy_records(
+        apps.get_model("todolist", "NewToDoList"),
+        apps.get_model("todolist", "NewToDoItem"),
+        apps.get_model("todolist", "ToDoList"),
+        apps.get_model("todolist", "ToDoItem"),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("todolist", "0002_todoitem_unique_constraint"),
+    ]
+
+    operations = [
+        # Constraint names must be unique across tables on some databases, so drop it
+        # from the old table before the new one is created
+        migrations.RemoveConstraint(
+            model_name="todoitem",
+            name="uniq_list_priority",
+        ),
+        migrations.CreateModel(
+            name="NewToDoList",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=25, unique=True)),
+                ("description", models.CharField(max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="NewToDoItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=25, unique=True)),
+                ("description", models.CharField(max_length=255)),
+                ("priority", models.IntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "to_do_list",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="todolist.newtodolist",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["to_do_list", "priority"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("to_do_list", "priority"), name="uniq_list_priority"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(copy_to_new_tables, copy_to_old_tables),
+        migrations.DeleteModel(
+            name="ToDoItem",
+        ),
+        migrations.DeleteModel(
+            name="ToDoList",
+        ),
+        migrations.RenameModel(
+            old_name="NewToDoList",
+            new_name="ToDoList",
+        ),
+        migrations.RenameModel(
+            old_name="NewToDoItem",
+            new_name="ToDoItem",
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-14 18:02
+
+from django.db import migrations, models
+
+from ._priority_range import renumber_out_of_range_priorities
+
+
+def renumber_priorities(apps, schema_editor):
+    """
+    Earlier versions accepted any integer priority. Renumber the todo lists holding ones
+    the narrowed field can not store, or that are above the highest priority now allowed
+    """
+    renumber_out_of_range_priorities(apps, schema_editor, 16383)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("todolist", "0003_surrogate_primary_keys"),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_priorities, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="todoitem",
+            name="priority",
+            field=models.PositiveSmallIntegerField(),
+        ),
+    ]
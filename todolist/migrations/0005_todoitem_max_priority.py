@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-14 18:53
+
+import django.core.validators
+from django.db import migrations, models
+
+from ._priority_range import renumber_out_of_range_priorities
+
+
+def renumber_priorities(apps, schema_editor):
+    """
+    Earlier versions of the previous migration let priorities above the highest one now
+    allowed through. Renumber the todo lists holding them
+    """
+    renumber_out_of_range_priorities(apps, schema_editor, 16383)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("todolist", "0004_todoitem_priority_small_int"),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_priorities, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="todoitem",
+            name="priority",
+            field=models.PositiveSmallIntegerField(
+                validators=[django.core.validators.MaxValueValidator(16383)]
+            ),
+        ),
+    ]
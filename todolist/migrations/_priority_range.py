@@ -0,0 +1,59 @@
+""" Data fixes shared by the migrations narrowing the range of todo item priorities """
+from itertools import groupby
+
+from django.db.models import Q
+from django.utils import timezone
+
+
+def renumber_out_of_range_priorities(apps, schema_editor, max_priority):
+    """
+    Renumber the items of every todo list holding a priority outside 0..max_priority from
+    1 upwards, keeping their order. Todo lists with all priorities in range are left as is.
+    Fails naming the todo lists that have too many items to fit in the range
+    """
+    to_do_item = apps.get_model("todolist", "ToDoItem")
+    list_ids = set(
+        to_do_item.objects.filter(
+            Q(priority__lt=0) | Q(priority__gt=max_priority)
+        ).values_list("to_do_list_id", flat=True)
+    )
+    if not list_ids:
+        return
+
+    items = list(
+        to_do_item.objects.filter(to_do_list_id__in=list_ids)
+        .select_related("to_do_list")
+        .order_by("to_do_list_id", "priority")
+        .only("pk", "priority", "to_do_list__name")
+    )
+    items_by_list = [
+        list(list_items)
+        for _, list_items in groupby(items, key=lambda item: item.to_do_list_id)
+    ]
+    too_long = sorted(
+        list_items[0].to_do_list.name
+        for list_items in items_by_list
+        if len(list_items) > max_priority
+    )
+    if too_long:
+        raise ValueError(
+            f"Todo lists {', '.join(too_long)} have priorities outside 0..{max_priority} "
+            f"and more than {max_priority} items, so they can not be renumbered"
+        )
+
+    # The new priorities can clash with ones not yet renumbered, so the uniqueness
+    # constraint is lifted while they are written. The items are changed, so their
+    # timestamp is too, which changes the version of any cached results holding them
+    now = timezone.now()
+    for list_items in items_by_list:
+        for priority, item in enumerate(list_items, start=1):
+            item.priority = priority
+            item.updated_at = now
+    (constraint,) = (
+        constraint
+        for constraint in to_do_item._meta.constraints
+        if constraint.name == "uniq_list_priority"
+    )
+    schema_editor.remove_constraint(to_do_item, constraint)
+    to_do_item.objects.bulk_update(items, ["priority", "updated_at"], batch_size=500)
+    schema_editor.add_constraint(to_do_item, constraint)
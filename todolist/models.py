@@ -1,35 +1,109 @@
 """ Basic models for a set of todo lists """
+from django.core.validators import MaxValueValidator
 from django.db import models
+from django.db.models.functions import RowNumber
+
+
+class SummaryManager(models.Manager):  # pylint: disable=too-few-public-methods
+    """Fetch only the fields needed to identify a record and tell if it changed"""
+
+    def get_queryset(self):
+        """Limit the fields fetched. Overrides a method in the base class"""
+        return super().get_queryset().only("name", "updated_at")
 
 
 class ToDoList(models.Model):
     """Basic To Do List"""
 
-    name = models.CharField(max_length=25, primary_key=True)
+    name = models.CharField(max_length=25, unique=True)
     description = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # The first manager is the default, so it must stay the one fetching all fields
+    objects = models.Manager()
+    summary = SummaryManager()
+
     class Meta:
         ordering = ["name"]
 
     def __repr__(self):
-        return self.name + ": " + self.description
+        return f"{self.name}: {self.description}"
+
+
+class ToDoItemManager(models.Manager):  # pylint: disable=too-few-public-methods
+    """Fetch todo items along with their todo list, which is almost always needed"""
+
+    def get_queryset(self):
+        """Join the todo list to the items. Overrides a method in the base class"""
+        return super().get_queryset().select_related("to_do_list")
 
 
 class ToDoItem(models.Model):
     """Item on a To Do List"""
 
-    name = models.CharField(max_length=25, primary_key=True)
+    # Making room for an item can shift the priorities of others up to twice the highest
+    # priority in the todo list while they move, so priorities are capped at half of what
+    # the field can hold
+    MAX_PRIORITY = 16383
+
+    name = models.CharField(max_length=25, unique=True)
     description = models.CharField(max_length=255)
     to_do_list = models.ForeignKey(ToDoList, on_delete=models.CASCADE)
-    priority = models.IntegerField()
+    priority = models.PositiveSmallIntegerField(
+        validators=[MaxValueValidator(MAX_PRIORITY)]
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ToDoItemManager()
+
     class Meta:
         ordering = ["to_do_list", "priority"]
-        unique_together = ["to_do_list", "priority"]
+        # The index backing this constraint serves fetching the items of a todo list in
+        # priority order, so no separate index is needed. The default ordering sorts by
+        # the name of the todo list, which needs a join, so it is not served by the index
+        constraints = [
+            models.UniqueConstraint(
+                fields=["to_do_list", "priority"], name="uniq_list_priority"
+            )
+        ]
 
     def __repr__(self):
-        return self.name + ": " + self.description
+        return f"{self.name}: {self.description}"
+
+    @classmethod
+    def bulk_add(cls, items):
+        """
+        Add items from an iterable of field value dicts in batched inserts, for seeding
+        or importing data. Unlike the API, this does not move existing items to make room.
+        Any item whose name or priority clashes with an existing one is skipped. Priorities
+        are not validated, so they must not be above MAX_PRIORITY
+        """
+        return cls.objects.bulk_create(
+            (cls(**item) for item in items), batch_size=500, ignore_conflicts=True
+        )
+
+    @classmethod
+    def priority_run(cls, to_do_list, priority):
+        """
+        Find the run of consecutive used priorities in the todo list starting at the given
+        one. Returns the (priority, name) of each item in the run in priority order, and
+        the highest priority in the list, or None if the given priority is not used
+        """
+        # Within a run, priorities go up by one for each item, so the difference between
+        # an item's priority and its position is the same for every item in it. The DB
+        # works this out, so only the items in the run are returned. Every DB Django
+        # supports has window functions
+        rows = list(
+            cls.objects.filter(to_do_list=to_do_list, priority__gte=priority)
+            .annotate(
+                gap=models.F("priority")
+                - models.Window(RowNumber(), order_by=models.F("priority").asc()),
+                max_priority=models.Window(models.Max("priority")),
+            )
+            .filter(gap=priority - 1)
+            .order_by("priority")
+            .values_list("priority", "name", "max_priority")
+        )
+        return [row[:2] for row in rows], rows[0][2] if rows else None
@@ -1,53 +1,219 @@
 """ Serializers for models for a set of todo lists and items on those lists """
+from django.db import models
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.validators import UniqueValidator
 
 from .models import ToDoItem, ToDoList
 
 
-# Multiple models have a primary key field called 'name'. Updating it will
-# create a new model in the DB, so it needs to be prohibited. Django has
+# Multiple models have a unique field called 'name' used to look them up. It is
+# meant to be set once, so updating it needs to be prohibited. Django has
 # no standard method to declare a field 'set-not-update' requiring the following
 # mixin
 # https://stackoverflow.com/questions/52686199/how-to-make-a-field-editable-false-in-drf
 class ProhibitNameUpdateMixin:  # pylint: disable=too-few-public-methods
-    """Prohibit changing the 'name' field in the serializer"""
+    """
+    Prohibit changing the 'name' field in the serializer. Serializers using this mixin
+    must declare the 'name' field themselves
+    """
 
-    name = serializers.CharField(max_length=25)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The instance does not change once the serializer is created, so find the
+        # original name once instead of on every validation
+        self._orig_name = getattr(self.instance, "name", None)
 
     def validate_name(self, value):
         """Prohibit changing the 'name' field in the serializer"""
-        if self.instance and self.instance.name != value:
+        if self._orig_name is not None and self._orig_name != value:
             raise ValidationError("The name field may not be updated")
         return value
 
 
-class ToDoListSerializer(serializers.ModelSerializer, ProhibitNameUpdateMixin):
+# Metadata fields set by the DB on every record
+TIMESTAMP_FIELDS = ("created_at", "updated_at")
+
+
+# Clients that do not need the timestamp fields can ask for them to be left out, which
+# saves formatting them for every record
+class OptionalTimestampsMixin:  # pylint: disable=too-few-public-methods
+    """Leave out the timestamp fields if 'include_timestamps' is false in the context"""
+
+    def get_fields(self):
+        """Drop the timestamp fields if not wanted. Overrides a method in the base class"""
+        fields = super().get_fields()
+        if not self.context.get("include_timestamps", True):
+            for field_name in TIMESTAMP_FIELDS:
+                fields.pop(field_name, None)
+        return fields
+
+
+# Serializing a list normally runs the full serializer for each record, finding the
+# fields to output all over again. Find them once for the whole list instead. Serializers
+# using this must not override to_representation, since it is bypassed
+class FastListSerializer(serializers.ListSerializer):  # pylint: disable=abstract-method
+    """Serialize a list of records, looking up the fields to output once"""
+
+    def to_representation(self, data):
+        """Convert all records to dicts. Overrides a method in the base class"""
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        fields = [
+            (field.field_name, field.get_attribute, field.to_representation)
+            for field in self.child._readable_fields  # pylint: disable=protected-access
+        ]
+        results = []
+        for record in iterable:
+            result = {}
+            for field_name, get_attribute, to_representation in fields:
+                try:
+                    attribute = get_attribute(record)
+                except SkipField:
+                    continue
+                # Same handling of empty values as the base serializer
+                check_for_none = (
+                    attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+                )
+                result[field_name] = (
+                    None if check_for_none is None else to_representation(attribute)
+                )
+            results.append(result)
+        return results
+
+
+# Creating several records in one request would normally save them one at a time.
+# Insert them with a single bulk query instead. The child serializer must declare
+# the model it creates in its Meta
+class BulkCreateListSerializer(FastListSerializer):  # pylint: disable=abstract-method
+    """Create multiple records in a single query"""
+
+    def validate(self, attrs):
+        """Names must be unique. Those in the DB are checked per record, so check the request"""
+        names = [record["name"] for record in attrs]
+        if len(set(names)) != len(names):
+            raise ValidationError("Names must be unique within a request")
+        return attrs
+
+    def create(self, validated_data):
+        """Create all records with a bulk insert"""
+        model = self.child.Meta.model
+        return model.objects.bulk_create([model(**attrs) for attrs in validated_data])
+
+
+class ToDoItemBulkCreateListSerializer(  # pylint: disable=abstract-method
+    BulkCreateListSerializer
+):
+    """Create multiple todo items in a single query"""
+
+    def validate(self, attrs):
+        """
+        Existing items are moved to make room for new ones, but items in the same request
+        can not be moved around each other, so their priorities must not clash
+        """
+        attrs = super().validate(attrs)
+        positions = [(item["to_do_list"], item["priority"]) for item in attrs]
+        if len(set(positions)) != len(positions):
+            raise ValidationError(
+                "Items in the same todo list must have different priorities within a request"
+            )
+        return attrs
+
+
+# Endpoints that only read data use serializers where every field is read only. These
+# skip building validators and the other machinery only needed to accept input
+class ToDoListReadSerializer(  # pylint: disable=abstract-method
+    OptionalTimestampsMixin, serializers.Serializer
+):
+    """Read only serializer for a todo list"""
+
+    name = serializers.CharField(read_only=True)
+    description = serializers.CharField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        list_serializer_class = FastListSerializer
+
+
+class ToDoItemReadSerializer(  # pylint: disable=abstract-method
+    OptionalTimestampsMixin, serializers.Serializer
+):
+    """Read only serializer for an item on a todo list"""
+
+    name = serializers.CharField(read_only=True)
+    description = serializers.CharField(read_only=True)
+    to_do_list = serializers.SlugRelatedField(slug_field="name", read_only=True)
+    priority = serializers.IntegerField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        list_serializer_class = FastListSerializer
+
+
+class ToDoListSerializer(
+    ProhibitNameUpdateMixin, OptionalTimestampsMixin, serializers.Serializer
+):
     """Serializer for a todo list"""
 
+    # Fields are declared explicitly instead of using a ModelSerializer, which
+    # introspects the model to build them every time a serializer is created
+    name = serializers.CharField(
+        max_length=25, validators=[UniqueValidator(queryset=ToDoList.objects.all())]
+    )
+    description = serializers.CharField(max_length=255)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
+
     class Meta:
         model = ToDoList
-        fields = ("name", "description", "created_at", "updated_at")
+        list_serializer_class = BulkCreateListSerializer
+
+    def create(self, validated_data):
+        """Create a new todo list from validated data"""
+        return ToDoList.objects.create(**validated_data)
+
+    def update(self, instance, validated_data):
+        """Update an existing todo list from validated data"""
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save()
+        return instance
 
 
-class ToDoItemSerializer(serializers.ModelSerializer, ProhibitNameUpdateMixin):
+class ToDoItemSerializer(
+    ProhibitNameUpdateMixin, OptionalTimestampsMixin, serializers.Serializer
+):
     """Serializer for a itme on a todo list"""
 
+    # The model has a unique constraint on todo list and priority that is handled by
+    # modifying records in the view, so it is deliberately not validated here
+    name = serializers.CharField(
+        max_length=25, validators=[UniqueValidator(queryset=ToDoItem.objects.all())]
+    )
+    description = serializers.CharField(max_length=255)
+    # Only the identity of the todo list is needed to link an item to it
+    to_do_list = serializers.SlugRelatedField(
+        slug_field="name", queryset=ToDoList.summary.all()
+    )
+    # Must fit the range the model allows
+    priority = serializers.IntegerField(min_value=0, max_value=ToDoItem.MAX_PRIORITY)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
+
     class Meta:
         model = ToDoItem
-        fields = (
-            "name",
-            "description",
-            "to_do_list",
-            "priority",
-            "created_at",
-            "updated_at",
-        )
-
-    # The model has a unique_together constraint that is handled by modifying records in the
-    # view. It should not be enforced in the serializer. Since it is the only one in the model,
-    # this is the easiest way of doing so
-    # https://stackoverflow.com/questions/45999131/django-rest-framework-model-serializer-with-out-unique-together-validation
-    def get_unique_together_validators(self):
-        """Overriding method to disable unique together checks"""
-        return []
+        list_serializer_class = ToDoItemBulkCreateListSerializer
+
+    def create(self, validated_data):
+        """Create a new todo item from validated data"""
+        return ToDoItem.objects.create(**validated_data)
+
+    def update(self, instance, validated_data):
+        """Update an existing todo item from validated data"""
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save()
+        return instance
@@ -0,0 +1,101 @@
+""" Tests for todolist application migrations that change existing data """
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+from ..migrations._priority_range import renumber_out_of_range_priorities
+
+
+class PriorityRangeMigrationTest(TransactionTestCase):
+    """Test the migrations narrowing todo item priorities renumber those out of range"""
+
+    latest = "0005_todoitem_max_priority"
+
+    def migrate(self, target):
+        """Migrate the todolist app to the given migration, and return its models"""
+        executor = MigrationExecutor(connection)
+        executor.migrate([("todolist", target)])
+        executor.loader.build_graph()
+        return executor.loader.project_state([("todolist", target)]).apps
+
+    def tearDown(self):
+        """Leave the schema as the other tests expect it"""
+        self.migrate(self.latest)
+
+    def create_items(self, apps, priorities):
+        """Create todo lists with items at the given priorities, in a map from list name"""
+        to_do_list_model = apps.get_model("todolist", "ToDoList")
+        to_do_item_model = apps.get_model("todolist", "ToDoItem")
+        for list_name, list_priorities in priorities.items():
+            to_do_list = to_do_list_model.objects.create(
+                name=list_name, description=f"{list_name} to do list"
+            )
+            to_do_item_model.objects.bulk_create(
+                to_do_item_model(
+                    name=f"{list_name}Item{priority}",
+                    description="Test to do item",
+                    to_do_list=to_do_list,
+                    priority=priority,
+                )
+                for priority in list_priorities
+            )
+
+    def priorities(self, apps):
+        """Return a map from todo list name to its items' names in priority order"""
+        to_do_item_model = apps.get_model("todolist", "ToDoItem")
+        results = {}
+        for list_name, name in to_do_item_model.objects.order_by(
+            "to_do_list__name", "priority"
+        ).values_list("to_do_list__name", "name"):
+            results.setdefault(list_name, []).append(name)
+        return results
+
+    def test_narrowing_priorities_renumbers_out_of_range_lists(self):
+        """Lists with priorities the narrowed field can not hold are renumbered in order"""
+        apps = self.migrate("0003_surrogate_primary_keys")
+        self.create_items(
+            apps,
+            {"OutOfRange": [-5, 3, 40000], "InRange": [2, 7]},
+        )
+
+        apps = self.migrate(self.latest)
+        to_do_item_model = apps.get_model("todolist", "ToDoItem")
+        self.assertEqual(
+            dict(
+                to_do_item_model.objects.order_by("name").values_list(
+                    "name", "priority"
+                )
+            ),
+            {
+                "OutOfRangeItem-5": 1,
+                "OutOfRangeItem3": 2,
+                "OutOfRangeItem40000": 3,
+                "InRangeItem2": 2,
+                "InRangeItem7": 7,
+            },
+        )
+
+    def test_max_priority_migration_renumbers_lists_above_max(self):
+        """Priorities the field holds but above the highest allowed are renumbered"""
+        apps = self.migrate("0004_todoitem_priority_small_int")
+        self.create_items(apps, {"AboveMax": [4, 20000, 16384]})
+
+        apps = self.migrate(self.latest)
+        to_do_item_model = apps.get_model("todolist", "ToDoItem")
+        self.assertEqual(
+            list(to_do_item_model.objects.order_by("priority").values_list("priority")),
+            [(1,), (2,), (3,)],
+        )
+        self.assertEqual(
+            self.priorities(apps),
+            {"AboveMax": ["AboveMaxItem4", "AboveMaxItem16384", "AboveMaxItem20000"]},
+        )
+
+    def test_renumbering_list_too_long_for_range_names_it(self):
+        """A list with more items than the range holds fails naming the list"""
+        apps = self.migrate("0004_todoitem_priority_small_int")
+        self.create_items(apps, {"TooLong": [1, 2, 5], "Short": [1, 9]})
+
+        with self.assertRaisesMessage(ValueError, "Todo lists TooLong have"):
+            with connection.schema_editor() as schema_editor:
+                renumber_out_of_range_priorities(apps, schema_editor, 2)
@@ -8,15 +8,27 @@ from ..models import ToDoItem, ToDoList
 class ToDoListTest(TestCase):
     """Tests for the To Do List model"""
 
-    def setUp(self):
-        ToDoList.objects.create(name="FirstList", description="First Test List")
-        ToDoList.objects.create(name="SecondList", description="Second Test List")
+    @classmethod
+    def setUpTestData(cls):
+        ToDoList.objects.bulk_create(
+            [
+                ToDoList(name="FirstList", description="First Test List"),
+                ToDoList(name="SecondList", description="Second Test List"),
+            ]
+        )
 
     def test_repr(self):
         """Test the model representation"""
         first_to_do_list = ToDoList.objects.get(name="FirstList")
         self.assertEqual(repr(first_to_do_list), "FirstList: First Test List")
 
+    def test_summary_fetches_only_summary_fields(self):
+        """Validate that the summary manager does not fetch the other fields"""
+        first_to_do_list = ToDoList.summary.get(name="FirstList")
+        self.assertEqual(
+            first_to_do_list.get_deferred_fields(), {"description", "created_at"}
+        )
+
     def test_duplicate_name_raises(self):
         """Validate that the name must be unique"""
         with self.assertRaises(IntegrityError):
@@ -28,17 +40,18 @@ class ToDoListTest(TestCase):
 class ToDoListItem(TestCase):
     """Tests for the To Do List item model"""
 
-    def setUp(self):
-        self.first_list = ToDoList.objects.create(
-            name="FirstList", description="First Test List"
-        )
-        self.second_list = ToDoList.objects.create(
-            name="SecondList", description="Second Test List"
+    @classmethod
+    def setUpTestData(cls):
+        cls.first_list, cls.second_list = ToDoList.objects.bulk_create(
+            [
+                ToDoList(name="FirstList", description="First Test List"),
+                ToDoList(name="SecondList", description="Second Test List"),
+            ]
         )
         ToDoItem.objects.create(
             name="FirstItem",
             description="First Test Item",
-            to_do_list=self.first_list,
+            to_do_list=cls.first_list,
             priority=1,
         )
 
@@ -47,6 +60,12 @@ class ToDoListItem(TestCase):
         first_to_do_item = ToDoItem.objects.get(name="FirstItem")
         self.assertEqual(repr(first_to_do_item), "FirstItem: First Test Item")
 
+    def test_fetch_includes_todo_list(self):
+        """Validate that fetching items fetches their todo lists in the same query"""
+        with self.assertNumQueries(1):
+            names = [item.to_do_list.name for item in ToDoItem.objects.all()]
+        self.assertEqual(names, ["FirstList"])
+
     def test_duplicate_name_raises(self):
         """Validate that the name must be unique, even when it is in another list"""
         with self.assertRaises(IntegrityError):
@@ -93,3 +112,54 @@ class ToDoListItem(TestCase):
                 to_do_list=self.first_list,
                 priority=1,
             )
+
+    def test_bulk_add_inserts_items_skipping_clashes(self):
+        """Validate that bulk adding items inserts them, skipping any that clash"""
+        ToDoItem.bulk_add(
+            [
+                {
+                    "name": "SecondItem",
+                    "description": "Second Test Item",
+                    "to_do_list": self.first_list,
+                    "priority": 2,
+                },
+                {
+                    "name": "ClashingItem",
+                    "description": "Clashing Test Item",
+                    "to_do_list": self.first_list,
+                    "priority": 1,
+                },
+            ]
+        )
+        self.assertEqual(
+            list(
+                ToDoItem.objects.filter(to_do_list=self.first_list).values_list(
+                    "name", flat=True
+                )
+            ),
+            ["FirstItem", "SecondItem"],
+        )
+
+    def test_priority_run_finds_consecutive_priorities(self):
+        """Validate that the priority run stops at the first unused priority"""
+        ToDoItem.bulk_add(
+            {
+                "name": name,
+                "description": "Run Test Item",
+                "to_do_list": self.first_list,
+                "priority": priority,
+            }
+            for name, priority in [("SecondItem", 2), ("FourthItem", 4)]
+        )
+        self.assertEqual(
+            ToDoItem.priority_run(self.first_list, 1),
+            ([(1, "FirstItem"), (2, "SecondItem")], 4),
+        )
+        self.assertEqual(
+            ToDoItem.priority_run(self.first_list, 4), ([(4, "FourthItem")], 4)
+        )
+
+    def test_priority_run_unused_priority_is_empty(self):
+        """Validate that the priority run is empty when the priority is not used"""
+        self.assertEqual(ToDoItem.priority_run(self.first_list, 2), ([], None))
+        self.assertEqual(ToDoItem.priority_run(self.second_list, 1), ([], None))
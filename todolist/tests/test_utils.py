@@ -1,12 +1,21 @@
 """ Common utility methods for tests """
+from ..serializers import TIMESTAMP_FIELDS
 
 
 def strip_timestamps(model_dict):
     """
     Models contain timestamp metadata fields. To get stable tests, comparisions should normally
-    be done without the timestamps. This method strips them from model dicts
+    be done without the timestamps. This method returns a copy of a model dict without them.
+    The dict passed in is left as is, since it is often a record serialized once per test
+    class and shared by all of its tests
     """
-    if "created_at" in model_dict:
-        del model_dict["created_at"]
-    if "updated_at" in model_dict:
-        del model_dict["updated_at"]
+    return {
+        field_name: value
+        for field_name, value in model_dict.items()
+        if field_name not in TIMESTAMP_FIELDS
+    }
+
+
+def strip_timestamps_many(model_dicts):
+    """Return copies of all the model dicts in an iterable without the timestamp fields"""
+    return [strip_timestamps(model_dict) for model_dict in model_dicts]
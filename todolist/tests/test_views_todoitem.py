@@ -1,30 +1,49 @@
 """ Tests for views related to todo item manipulation """
-import json
-from copy import copy
+# pylint: disable=too-many-lines
+from collections import defaultdict
+from functools import cache
 
-from django.test import Client, TestCase
+from django.db import connection
+from django.db.models import Max
+from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
 
 from ..models import ToDoItem, ToDoList
 from ..serializers import ToDoItemSerializer
-from .test_utils import strip_timestamps
+from .test_utils import strip_timestamps, strip_timestamps_many
 
-# initialize the APIClient app
-client = Client()
+
+# URL resolution walks the URL patterns, so only do it once per URL
+@cache
+def mult_url():
+    """URL for the view on all todo items"""
+    return reverse("todolist:todoitemmult")
+
+
+@cache
+def single_url(name):
+    """URL for the view on the todo item with the given name"""
+    return reverse("todolist:todoitemsingle", kwargs={"name": name})
 
 
 class ToDoItemViewTestBase(TestCase):
     """Base class for ToDoItem view tests with common functionality"""
 
-    def init_db(self):
-        """Initialize DB for tests and return data as a map"""
-        # pylint: disable=attribute-defined-outside-init
-        self.to_do_list = ToDoList.objects.create(
-            name="TestList", description="Test to do list"
-        )
-        self.other_to_do_list = ToDoList.objects.create(
-            name="OtherTestList", description="Other Test to do list"
+    # Test classes needing more items in the test list add them here
+    extra_test_data = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Initialize DB for tests. This runs once per test class. Each test runs in its own
+        transaction and gets its own copy of the records, so tests may modify them
+        """
+        cls.to_do_list, cls.other_to_do_list = ToDoList.objects.bulk_create(
+            [
+                ToDoList(name="TestList", description="Test to do list"),
+                ToDoList(name="OtherTestList", description="Other Test to do list"),
+            ]
         )
 
         test_data = {
@@ -40,36 +59,97 @@ class ToDoItemViewTestBase(TestCase):
                 "description": "Third to do item",
                 "priority": 3,
             },
+            **cls.extra_test_data,
         }
-        self.records = {}
-        for name, values in test_data.items():
-            self.records[name] = ToDoItem.objects.create(
+        items = [
+            ToDoItem(
                 name=name,
                 description=values["description"],
-                to_do_list=self.to_do_list,
+                to_do_list=cls.to_do_list,
                 priority=values["priority"],
             )
-
+            for name, values in test_data.items()
+        ]
         # Add one item in the other todo list
-        self.other_list_item = ToDoItem.objects.create(
-            name="OtherFirstTodoItem",
-            description="Other list first todo item",
-            to_do_list=self.other_to_do_list,
-            priority=1,
+        items.append(
+            ToDoItem(
+                name="OtherFirstTodoItem",
+                description="Other list first todo item",
+                to_do_list=cls.other_to_do_list,
+                priority=1,
+            )
         )
+        *created_items, cls.other_list_item = ToDoItem.objects.bulk_create(items)
+        cls.records = dict(zip(test_data.keys(), created_items))
+        # Serialize the records once. Tests build their expected results from these
+        cls.serialized_records = {
+            item.name: data
+            for item, data in zip(items, ToDoItemSerializer(items, many=True).data)
+        }
+
+    def expected_results(self, names, changes=None):
+        """
+        Build the expected results for the named records, in the given order, from the
+        records serialized at setup. The changes map record names to the fields the test
+        changed. Timestamps may have been updated by the changes, so strip them
+        """
+        changes = changes or {}
+        results = []
+        for name in names:
+            result = {**self.serialized_records[name], **changes.get(name, {})}
+            results.append(strip_timestamps(result))
+        return results
+
+    def serialize_without_timestamps(self, records):
+        """
+        Serialize the records with the timestamps stripped. They change whenever a record
+        is saved, so stripping them gives stable comparisons
+        """
+        return strip_timestamps_many(ToDoItemSerializer(records, many=True).data)
+
+    def fetch_all_items(self):
+        """
+        Fetch all todo items from the DB in a single query, and return them as a map from
+        todo list id to the items in that list in priority order
+        """
+        items_by_list = defaultdict(list)
+        for item in ToDoItem.objects.all():
+            items_by_list[item.to_do_list_id].append(item)
+        return items_by_list
 
 
 class GetAllToDoItemTest(ToDoItemViewTestBase):
     """Test module for GET all to do items API"""
 
-    def setUp(self):
-        self.init_db()
-
     def test_get_all_todo_items_returns_records(self):
         """Get all records"""
-        response = client.get(reverse("todolist:todoitemmult"))
-        # Lists are sorted in alphabetical order, so the other list sorts first
-        records = [self.other_list_item] + list(self.records.values())
+        response = self.client.get(mult_url())
+        # Items are sorted by todo list name, and then by priority
+        records = ToDoItem.objects.order_by("to_do_list__name", "priority")
+        serializer = ToDoItemSerializer(records, many=True)
+        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_all_todo_items_matches_single_records(self):
+        """Get all records, which must match serializing each record on its own"""
+        response = self.client.get(mult_url())
+        records = ToDoItem.objects.order_by("to_do_list__name", "priority")
+        self.assertEqual(
+            response.data, [ToDoItemSerializer(record).data for record in records]
+        )
+
+    def test_get_all_todo_items_after_priority_change_returns_current_records(self):
+        """Results of a previous get are not returned once item priorities are moved"""
+        self.client.get(mult_url())
+
+        self.client.patch(
+            single_url("SecondItem"),
+            data={"priority": 1},
+            content_type="application/json",
+        )
+
+        response = self.client.get(mult_url())
+        records = ToDoItem.objects.order_by("to_do_list__name", "priority")
         serializer = ToDoItemSerializer(records, many=True)
         self.assertEqual(response.data, serializer.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -78,40 +158,35 @@ class GetAllToDoItemTest(ToDoItemViewTestBase):
 class GetSingleToDoItemTest(ToDoItemViewTestBase):
     """Test module for GET single todoitem API"""
 
-    def setUp(self):
-        self.init_db()
-
     def test_get_valid_single_todoitem_returns_it(self):
         """Get single record that exists"""
         test_name = "SecondItem"
-        response = client.get(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name})
-        )
-        serializer = ToDoItemSerializer(self.records[test_name])
-        self.assertEqual(response.data, serializer.data)
+        response = self.client.get(single_url(test_name))
+        self.assertEqual(response.data, self.serialized_records[test_name])
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     def test_get_invalid_single_todoitem_returns_404(self):
         """Get single record that does not exist"""
-        response = client.get(
-            reverse("todolist:todoitemsingle", kwargs={"name": "invalid"})
-        )
+        response = self.client.get(single_url("invalid"))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_too_long_name_returns_404_without_query(self):
+        """Get single record with a name too long to exist, which is not looked up"""
+        with self.assertNumQueries(0):
+            response = self.client.get(f"/api/v1/todoitem/{'x' * 26}/")
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
 class PostSingleToDoItemTest(ToDoItemViewTestBase):
     """Test module for POST single todoitem API"""
 
-    def setUp(self):
-        self.init_db()
-        # Add one more to-do item with a non-consecutive priority
-        name = "FifthItem"
-        self.records[name] = ToDoItem.objects.create(
-            name=name,
-            description="Fifth todo item",
-            to_do_list=self.to_do_list,
-            priority=5,
-        )
+    # Add one more to-do item with a non-consecutive priority
+    extra_test_data = {
+        "FifthItem": {
+            "description": "Fifth todo item",
+            "priority": 5,
+        },
+    }
 
     def test_post_valid_todoitem_inserts_it(self):
         """Posting a valid record with an unused name inserts it"""
@@ -123,23 +198,23 @@ class PostSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": self.to_do_list.name,
             "priority": 4,
         }
-        response = client.post(
-            reverse("todolist:todoitemmult"),
-            data=json.dumps(valid_payload),
+        response = self.client.post(
+            mult_url(),
+            data=valid_payload,
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-
-        # Creating the record set timestamp fields. To get a stable test,
-        # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
-        self.assertEqual(returned_data, valid_payload)
+        data = response.data
 
         # Fetch the record from the DB and validate it was inserted
         test_record = ToDoItem.objects.get(name=test_name)
         serializer = ToDoItemSerializer(test_record)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(data, serializer.data)
+
+        # Creating the record set timestamp fields. To get a stable test,
+        # strip them before doing the comparision
+        data = strip_timestamps(data)
+        self.assertEqual(data, valid_payload)
 
     def test_post_valid_todoitem_matching_priority_moves_other_items(self):
         """
@@ -154,46 +229,88 @@ class PostSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": self.to_do_list.name,
             "priority": 2,
         }
-        response = client.post(
-            reverse("todolist:todoitemmult"),
-            data=json.dumps(valid_payload),
-            content_type="application/json",
-        )
+        # Moving items takes a fixed number of queries however many move: one to lock the
+        # list they are in, one to find the run of items to move, and one or two updates.
+        # For runs of one or two items, as in these tests, that is one more than saving each
+        # moved item did, since those saves took no lock. It is the same for three items,
+        # and fewer for longer runs
+        with self.assertNumQueries(9):
+            response = self.client.post(
+                mult_url(),
+                data=valid_payload,
+                content_type="application/json",
+            )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.data
 
         # Creating the record set timestamp fields. To get a stable test,
         # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
-        self.assertEqual(returned_data, valid_payload)
+        data = strip_timestamps(data)
+        self.assertEqual(data, valid_payload)
 
         # Fetch all records for the todo list and ensure they are correct.
         # Update the stored results to account for the priority change
-        self.records["SecondItem"].priority = 3
-        self.records["ThirdItem"].priority = 4
-
-        expected_results = copy(
-            ToDoItemSerializer(self.records.values(), many=True).data
+        expected_results = self.expected_results(
+            self.records,
+            {"SecondItem": {"priority": 3}, "ThirdItem": {"priority": 4}},
         )
-        # The records have timestamp fields, which may have been updated if the priority was
-        # changed. To get a stable test, strip them before the comparision
-        for result in expected_results:
-            strip_timestamps(result)
 
         # Insert the newly created record in the correct spot
         expected_results.insert(1, valid_payload)
 
-        actual_records = ToDoItem.objects.filter(to_do_list=self.to_do_list)
-        actual_results = copy(ToDoItemSerializer(actual_records, many=True).data)
-        for result in actual_results:
-            strip_timestamps(result)
+        all_records = self.fetch_all_items()
+        actual_results = self.serialize_without_timestamps(
+            all_records[self.to_do_list.id]
+        )
         self.assertEqual(expected_results, actual_results)
 
-        # Fetch the record for the other list from the DB and validate it was not altered
-        expected_serializer = ToDoItemSerializer(self.other_list_item)
-        test_record = ToDoItem.objects.get(name=self.other_list_item.name)
-        actual_serializer = ToDoItemSerializer(test_record)
-        self.assertEqual(expected_serializer.data, actual_serializer.data)
+        # Validate the record for the other list was not altered
+        actual_serializer = ToDoItemSerializer(
+            all_records[self.other_to_do_list.id], many=True
+        )
+        self.assertEqual(
+            [self.serialized_records["OtherFirstTodoItem"]], actual_serializer.data
+        )
+
+    def test_post_matching_priority_long_run_moves_in_fixed_queries(self):
+        """
+        Posting a valid record in front of a long run of used priorities moves all of them
+        with the same number of queries as a short run
+        """
+
+        ToDoItem.objects.bulk_create(
+            ToDoItem(
+                name=f"OtherItem{priority}",
+                description="Other list todo item",
+                to_do_list=self.other_to_do_list,
+                priority=priority,
+            )
+            for priority in range(2, 9)
+        )
+        valid_payload = {
+            "name": "OtherNewItem",
+            "description": "Other list new todo item",
+            "to_do_list": self.other_to_do_list.name,
+            "priority": 1,
+        }
+        # Saving each moved item would take 14 queries here
+        with self.assertNumQueries(9):
+            response = self.client.post(
+                mult_url(),
+                data=valid_payload,
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(
+            list(
+                ToDoItem.objects.filter(to_do_list=self.other_to_do_list).values_list(
+                    "name", "priority"
+                )
+            ),
+            [("OtherNewItem", 1), ("OtherFirstTodoItem", 2)]
+            + [(f"OtherItem{priority}", priority + 1) for priority in range(2, 9)],
+        )
 
     def test_post_valid_todoitem_diff_list_same_priority_inserts_it(self):
         """
@@ -208,29 +325,30 @@ class PostSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": self.other_to_do_list.name,
             "priority": existing_item.priority,
         }
-        response = client.post(
-            reverse("todolist:todoitemmult"),
-            data=json.dumps(valid_payload),
+        response = self.client.post(
+            mult_url(),
+            data=valid_payload,
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-
-        # Creating the record set timestamp fields. To get a stable test,
-        # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
-        self.assertEqual(returned_data, valid_payload)
+        data = response.data
 
         # Fetch the record from the DB and validate it was inserted
         test_record = ToDoItem.objects.get(name=test_name)
         serializer = ToDoItemSerializer(test_record)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(data, serializer.data)
+
+        # Creating the record set timestamp fields. To get a stable test,
+        # strip them before doing the comparision
+        data = strip_timestamps(data)
+        self.assertEqual(data, valid_payload)
 
         # Fetch the other record from the DB and validate it was not altered
-        expected_serializer = ToDoItemSerializer(existing_item)
         test_record = ToDoItem.objects.get(name=existing_item.name)
         actual_serializer = ToDoItemSerializer(test_record)
-        self.assertEqual(expected_serializer.data, actual_serializer.data)
+        self.assertEqual(
+            self.serialized_records[existing_item.name], actual_serializer.data
+        )
 
     def test_post_invalid_todoitem_returns_400(self):
         """Posting an invalid record returns a 400"""
@@ -241,13 +359,131 @@ class PostSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": self.to_do_list.name,
             "priority": 4,
         }
-        response = client.post(
-            reverse("todolist:todoitemmult"),
-            data=json.dumps(invalid_payload),
+        response = self.client.post(
+            mult_url(),
+            data=invalid_payload,
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_negative_priority_returns_400(self):
+        """Posting a record with a negative priority returns a 400"""
+
+        invalid_payload = {
+            "name": "InvalidItem",
+            "description": "Invalid to do item",
+            "to_do_list": self.to_do_list.name,
+            "priority": -1,
+        }
+        response = self.client.post(
+            mult_url(),
+            data=invalid_payload,
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_post_priority_above_max_returns_400(self):
+        """Posting a record with a priority lower than the lowest allowed returns a 400"""
+
+        invalid_payload = {
+            "name": "InvalidItem",
+            "description": "Invalid to do item",
+            "to_do_list": self.to_do_list.name,
+            "priority": ToDoItem.MAX_PRIORITY + 1,
+        }
+        response = self.client.post(
+            mult_url(),
+            data=invalid_payload,
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_moving_item_past_max_priority_returns_400(self):
+        """
+        Posting a record that would move an existing item to a priority lower than the
+        lowest allowed returns a 400 and changes nothing
+        """
+
+        last_item = ToDoItem.objects.create(
+            name="LastItem",
+            description="Last to do item",
+            to_do_list=self.to_do_list,
+            priority=ToDoItem.MAX_PRIORITY,
+        )
+        invalid_payload = {
+            "name": "InvalidItem",
+            "description": "Invalid to do item",
+            "to_do_list": self.to_do_list.name,
+            "priority": ToDoItem.MAX_PRIORITY,
+        }
+        response = self.client.post(
+            mult_url(),
+            data=invalid_payload,
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("priority", response.data)
+
+        self.assertFalse(ToDoItem.objects.filter(name="InvalidItem").exists())
+        last_item.refresh_from_db()
+        self.assertEqual(last_item.priority, ToDoItem.MAX_PRIORITY)
+
+    def test_post_moving_run_with_max_priority_used_fits_priority_field(self):
+        """
+        Moving a run of items in a todo list that also has an item at the lowest allowed
+        priority never sets a priority the field can't hold, even while the run is parked
+        """
+
+        ToDoItem.objects.create(
+            name="LastItem",
+            description="Last to do item",
+            to_do_list=self.to_do_list,
+            priority=ToDoItem.MAX_PRIORITY,
+        )
+        # SQLite does not enforce the range of the field, so check the highest priority
+        # after every update instead of relying on the DB to reject it
+        highest_priorities = []
+
+        def record_highest_priority(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if sql.startswith("UPDATE"):
+                highest_priorities.append(
+                    ToDoItem.objects.aggregate(Max("priority"))["priority__max"]
+                )
+            return result
+
+        valid_payload = {
+            "name": "FourthItem",
+            "description": "Fourth to do item",
+            "to_do_list": self.to_do_list.name,
+            "priority": 1,
+        }
+        with connection.execute_wrapper(record_highest_priority):
+            response = self.client.post(
+                mult_url(),
+                data=valid_payload,
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # The highest value a PositiveSmallIntegerField holds on every DB
+        self.assertLessEqual(max(highest_priorities), 32767)
+        self.assertEqual(
+            list(
+                ToDoItem.objects.filter(to_do_list=self.to_do_list).values_list(
+                    "name", "priority"
+                )
+            ),
+            [
+                ("FourthItem", 1),
+                ("FirstItem", 2),
+                ("SecondItem", 3),
+                ("ThirdItem", 4),
+                ("FifthItem", 5),
+                ("LastItem", ToDoItem.MAX_PRIORITY),
+            ],
+        )
+
     def test_post_duplicate_todoitem_name_returns_400(self):
         """Posting a record with a name already in use returns a 400"""
 
@@ -258,17 +494,16 @@ class PostSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": self.to_do_list.name,
             "priority": 4,
         }
-        response = client.post(
-            reverse("todolist:todoitemmult"),
-            data=json.dumps(invalid_payload),
+        response = self.client.post(
+            mult_url(),
+            data=invalid_payload,
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
         # Validate that the duplicate record was not inserted. Can't use get()
         # here since it will raise if the insert succeeded
-        records = ToDoItem.objects.filter(name=test_name)
-        self.assertEqual(len(records), 1)
+        self.assertEqual(ToDoItem.objects.filter(name=test_name).count(), 1)
 
     def test_post_nonexistent_todolist_returns_400(self):
         """Posting a record for a todolist which does not exist returns a 400"""
@@ -280,25 +515,126 @@ class PostSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": "I_do_not_exist",
             "priority": 4,
         }
-        response = client.post(
-            reverse("todolist:todoitemmult"),
-            data=json.dumps(invalid_payload),
+        response = self.client.post(
+            mult_url(),
+            data=invalid_payload,
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
         # Validate that the invalid record was not inserted. Can't use get()
         # here since it will raise if the insert succeeded
-        records = ToDoItem.objects.filter(name=test_name)
-        self.assertEqual(len(records), 0)
+        self.assertFalse(ToDoItem.objects.filter(name=test_name).exists())
+
+
+class PostMultipleToDoItemTest(ToDoItemViewTestBase):
+    """Test module for POST multiple todoitems API"""
+
+    def test_post_valid_todoitems_matching_priorities_moves_other_items(self):
+        """
+        Posting a list of valid records with already used priorities inserts them at the
+        requested priorities, and moves other items downward in priority to make room
+        """
+
+        # Listed out of priority order to show the request order does not matter
+        valid_payload = [
+            {
+                "name": "FifthItem",
+                "description": "Fifth to do item",
+                "to_do_list": self.to_do_list.name,
+                "priority": 3,
+            },
+            {
+                "name": "FourthItem",
+                "description": "Fourth to do item",
+                "to_do_list": self.to_do_list.name,
+                "priority": 1,
+            },
+        ]
+        with self.assertNumQueries(14):
+            response = self.client.post(
+                mult_url(),
+                data=valid_payload,
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.data
+
+        # Creating the records set timestamp fields. To get a stable test,
+        # strip them before doing the comparision
+        data = strip_timestamps_many(data)
+        self.assertEqual(data, valid_payload)
+
+        # Fetch all records for the todo list and ensure they are correct.
+        # Update the stored results to account for the priority changes
+        expected_results = self.expected_results(
+            self.records,
+            {
+                "FirstItem": {"priority": 2},
+                "SecondItem": {"priority": 4},
+                "ThirdItem": {"priority": 5},
+            },
+        )
+
+        # Insert the newly created records in the correct spots
+        expected_results.insert(0, valid_payload[1])
+        expected_results.insert(2, valid_payload[0])
+
+        actual_records = ToDoItem.objects.filter(to_do_list=self.to_do_list)
+        actual_results = self.serialize_without_timestamps(actual_records)
+        self.assertEqual(expected_results, actual_results)
+
+    def test_post_empty_list_inserts_nothing(self):
+        """Posting an empty list inserts nothing, and locks no todo lists"""
+
+        item_count = ToDoItem.objects.count()
+        # Only the transaction's savepoints, since there are no todo lists to lock
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                mult_url(),
+                data=[],
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, [])
+        self.assertEqual(ToDoItem.objects.count(), item_count)
+
+    def test_post_todoitems_clashing_priorities_returns_400(self):
+        """
+        Posting a list of records where two have the same priority in the same todo list
+        returns a 400
+        """
+
+        invalid_payload = [
+            {
+                "name": "FourthItem",
+                "description": "Fourth to do item",
+                "to_do_list": self.to_do_list.name,
+                "priority": 4,
+            },
+            {
+                "name": "FifthItem",
+                "description": "Fifth to do item",
+                "to_do_list": self.to_do_list.name,
+                "priority": 4,
+            },
+        ]
+        response = self.client.post(
+            mult_url(),
+            data=invalid_payload,
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Validate that neither record was inserted
+        self.assertFalse(
+            ToDoItem.objects.filter(name__in=["FourthItem", "FifthItem"]).exists()
+        )
 
 
 class PutSingleToDoItemTest(ToDoItemViewTestBase):
     """Test module for PUT single todoitem API"""
 
-    def setUp(self):
-        self.init_db()
-
     def test_put_valid_todoitem_unused_priority_updates_it(self):
         """Updating a valid record with valid data and an unused priority updatess it"""
 
@@ -309,23 +645,26 @@ class PutSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": self.to_do_list.name,
             "priority": 4,
         }
-        response = client.put(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name}),
-            data=json.dumps(valid_payload),
-            content_type="application/json",
-        )
+        # An unused priority still locks the todo list, so a concurrent move waits, and
+        # then needs only a check that no items must move
+        with self.assertNumQueries(8):
+            response = self.client.put(
+                single_url(test_name),
+                data=valid_payload,
+                content_type="application/json",
+            )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-
-        # Creating the record set timestamp fields. To get a stable test,
-        # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
-        self.assertEqual(returned_data, valid_payload)
+        data = response.data
 
         # Fetch the record from the DB and validate it was updated
         test_record = ToDoItem.objects.get(name=test_name)
         serializer = ToDoItemSerializer(test_record)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(data, serializer.data)
+
+        # Creating the record set timestamp fields. To get a stable test,
+        # strip them before doing the comparision
+        data = strip_timestamps(data)
+        self.assertEqual(data, valid_payload)
 
     def test_put_valid_todoitem_used_priority_higher_updates_it(self):
         """
@@ -341,45 +680,40 @@ class PutSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": self.to_do_list.name,
             "priority": 1,
         }
-        response = client.put(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name}),
-            data=json.dumps(valid_payload),
-            content_type="application/json",
-        )
+        with self.assertNumQueries(10):
+            response = self.client.put(
+                single_url(test_name),
+                data=valid_payload,
+                content_type="application/json",
+            )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
 
         # Creating the record set timestamp fields. To get a stable test,
         # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
-        self.assertEqual(returned_data, valid_payload)
+        data = strip_timestamps(data)
+        self.assertEqual(data, valid_payload)
 
         # Fetch all records for the todo list and ensure they are correct.
         # Update the stored results, and the ordering,  to account for the
         # priority change
-        self.records["SecondItem"].priority = 1
-        self.records["FirstItem"].priority = 2
-        expected_records = [
-            self.records["SecondItem"],
-            self.records["FirstItem"],
-            self.records["ThirdItem"],
-        ]
-        expected_results = copy(ToDoItemSerializer(expected_records, many=True).data)
-        # The records have timestamp fields, which may have been updated if the priority was
-        # changed. To get a stable test, strip them before the comparision
-        for result in expected_results:
-            strip_timestamps(result)
-        actual_records = ToDoItem.objects.filter(to_do_list=self.to_do_list)
-        actual_results = copy(ToDoItemSerializer(actual_records, many=True).data)
-        for result in actual_results:
-            strip_timestamps(result)
+        expected_results = self.expected_results(
+            ["SecondItem", "FirstItem", "ThirdItem"],
+            {"SecondItem": {"priority": 1}, "FirstItem": {"priority": 2}},
+        )
+        all_records = self.fetch_all_items()
+        actual_results = self.serialize_without_timestamps(
+            all_records[self.to_do_list.id]
+        )
         self.assertEqual(expected_results, actual_results)
 
-        # Fetch the record for the other list from the DB and validate it was not altered
-        expected_serializer = ToDoItemSerializer(self.other_list_item)
-        test_record = ToDoItem.objects.get(name=self.other_list_item.name)
-        actual_serializer = ToDoItemSerializer(test_record)
-        self.assertEqual(expected_serializer.data, actual_serializer.data)
+        # Validate the record for the other list was not altered
+        actual_serializer = ToDoItemSerializer(
+            all_records[self.other_to_do_list.id], many=True
+        )
+        self.assertEqual(
+            [self.serialized_records["OtherFirstTodoItem"]], actual_serializer.data
+        )
 
     def test_put_valid_todoitem_used_priority_lower_updates_it(self):
         """
@@ -394,46 +728,41 @@ class PutSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": self.to_do_list.name,
             "priority": 3,
         }
-        response = client.put(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name}),
-            data=json.dumps(valid_payload),
-            content_type="application/json",
-        )
+        with self.assertNumQueries(9):
+            response = self.client.put(
+                single_url(test_name),
+                data=valid_payload,
+                content_type="application/json",
+            )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
 
         # Creating the record set timestamp fields. To get a stable test,
         # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
-        self.assertEqual(returned_data, valid_payload)
+        data = strip_timestamps(data)
+        self.assertEqual(data, valid_payload)
 
         # Fetch all records for the todo list and ensure they are correct.
         # Update the stored results, and the ordering,  to account for the
         # priority change
-        self.records["ThirdItem"].priority = 4
-        self.records["FirstItem"].priority = 3
-        expected_records = [
-            self.records["SecondItem"],
-            self.records["FirstItem"],
-            self.records["ThirdItem"],
-        ]
-        expected_results = copy(ToDoItemSerializer(expected_records, many=True).data)
-        # The records have timestamp fields, which may have been updated if the priority was
-        # changed. To get a stable test, strip them before the comparision
-        for result in expected_results:
-            strip_timestamps(result)
+        expected_results = self.expected_results(
+            ["SecondItem", "FirstItem", "ThirdItem"],
+            {"ThirdItem": {"priority": 4}, "FirstItem": {"priority": 3}},
+        )
 
-        actual_records = ToDoItem.objects.filter(to_do_list=self.to_do_list)
-        actual_results = copy(ToDoItemSerializer(actual_records, many=True).data)
-        for result in actual_results:
-            strip_timestamps(result)
+        all_records = self.fetch_all_items()
+        actual_results = self.serialize_without_timestamps(
+            all_records[self.to_do_list.id]
+        )
         self.assertEqual(expected_results, actual_results)
 
-        # Fetch the record for the other list from the DB and validate it was not altered
-        expected_serializer = ToDoItemSerializer(self.other_list_item)
-        test_record = ToDoItem.objects.get(name=self.other_list_item.name)
-        actual_serializer = ToDoItemSerializer(test_record)
-        self.assertEqual(expected_serializer.data, actual_serializer.data)
+        # Validate the record for the other list was not altered
+        actual_serializer = ToDoItemSerializer(
+            all_records[self.other_to_do_list.id], many=True
+        )
+        self.assertEqual(
+            [self.serialized_records["OtherFirstTodoItem"]], actual_serializer.data
+        )
 
     def test_put_valid_todoitem_change_valid_list_unused_priority_updates_it(self):
         """
@@ -448,23 +777,23 @@ class PutSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": self.other_to_do_list.name,
             "priority": 2,
         }
-        response = client.put(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name}),
-            data=json.dumps(valid_payload),
+        response = self.client.put(
+            single_url(test_name),
+            data=valid_payload,
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-
-        # Creating the record set timestamp fields. To get a stable test,
-        # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
-        self.assertEqual(returned_data, valid_payload)
+        data = response.data
 
         # Fetch the record from the DB and validate it was updated
         test_record = ToDoItem.objects.get(name=test_name)
         serializer = ToDoItemSerializer(test_record)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(data, serializer.data)
+
+        # Creating the record set timestamp fields. To get a stable test,
+        # strip them before doing the comparision
+        data = strip_timestamps(data)
+        self.assertEqual(data, valid_payload)
 
     def test_put_valid_todoitem_change_valid_list_used_priority_moves_priorities(self):
         """
@@ -479,43 +808,46 @@ class PutSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": self.other_to_do_list.name,
             "priority": 1,
         }
-        response = client.put(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name}),
-            data=json.dumps(valid_payload),
-            content_type="application/json",
-        )
+        with self.assertNumQueries(9):
+            response = self.client.put(
+                single_url(test_name),
+                data=valid_payload,
+                content_type="application/json",
+            )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
 
         # Creating the record set timestamp fields. To get a stable test,
         # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
-        self.assertEqual(returned_data, valid_payload)
+        data = strip_timestamps(data)
+        self.assertEqual(data, valid_payload)
 
         # Fetch all records for the todo list and ensure they are correct.
         # Update the stored results, and the ordering,  to account for the
         # priority change
-        self.records["FirstItem"].to_do_list = self.other_to_do_list
-        self.other_list_item.priority = 2
-        expected_records = [self.records["FirstItem"], self.other_list_item]
-        expected_results = copy(ToDoItemSerializer(expected_records, many=True).data)
-        # The records have timestamp fields, which may have been updated if the priority was
-        # changed. To get a stable test, strip them before the comparision
-        for result in expected_results:
-            strip_timestamps(result)
-
-        actual_records = ToDoItem.objects.filter(to_do_list=self.other_to_do_list)
-        actual_results = copy(ToDoItemSerializer(actual_records, many=True).data)
-        for result in actual_results:
-            strip_timestamps(result)
+        expected_results = self.expected_results(
+            ["FirstItem", "OtherFirstTodoItem"],
+            {
+                "FirstItem": {"to_do_list": self.other_to_do_list.name},
+                "OtherFirstTodoItem": {"priority": 2},
+            },
+        )
+
+        all_records = self.fetch_all_items()
+        actual_results = self.serialize_without_timestamps(
+            all_records[self.other_to_do_list.id]
+        )
         self.assertEqual(expected_results, actual_results)
 
         # Fetch the records remaining in the original todo list from the DB and validate
         # they were not altered
-        expected_records = [self.records["SecondItem"], self.records["ThirdItem"]]
-        expected_results = ToDoItemSerializer(expected_records, many=True).data
-        actual_records = ToDoItem.objects.filter(to_do_list=self.to_do_list)
-        actual_results = ToDoItemSerializer(actual_records, many=True).data
+        expected_results = [
+            self.serialized_records["SecondItem"],
+            self.serialized_records["ThirdItem"],
+        ]
+        actual_results = ToDoItemSerializer(
+            all_records[self.to_do_list.id], many=True
+        ).data
         self.assertEqual(expected_results, actual_results)
 
     def test_put_change_todoitem_name_returns_400(self):
@@ -529,18 +861,17 @@ class PutSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": self.to_do_list.name,
             "priority": 2,
         }
-        response = client.put(
-            reverse("todolist:todoitemsingle", kwargs={"name": old_name}),
-            data=json.dumps(invalid_payload),
+        response = self.client.put(
+            single_url(old_name),
+            data=invalid_payload,
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-        # Since 'name' is the primary key, a successful DB update would have duplicated
-        # the existing record with the new primary key value. Validate that one does
-        # NOT exist. Can't use get() here since it will raise if the record does not exist
-        records = ToDoItem.objects.filter(name=new_name)
-        self.assertEqual(len(records), 0)
+        # A successful DB update would have renamed the existing record. Validate that
+        # a record with the new name does NOT exist. Can't use get() here since it will
+        # raise if the record does not exist
+        self.assertFalse(ToDoItem.objects.filter(name=new_name).exists())
 
     def test_put_change_todoitem_invalid_list_returns_400(self):
         """
@@ -555,24 +886,23 @@ class PutSingleToDoItemTest(ToDoItemViewTestBase):
             "to_do_list": "I_do_not_exist",
             "priority": 2,
         }
-        response = client.put(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name}),
-            data=json.dumps(invalid_payload),
+        response = self.client.put(
+            single_url(test_name),
+            data=invalid_payload,
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
         # Fetch the record and ensure it is still in the orignal todo list
-        record = ToDoItem.objects.get(name=test_name)
-        self.assertEqual(self.records["SecondItem"].to_do_list, record.to_do_list)
+        to_do_list_id = ToDoItem.objects.values_list("to_do_list_id", flat=True).get(
+            name=test_name
+        )
+        self.assertEqual(self.records["SecondItem"].to_do_list_id, to_do_list_id)
 
 
 class PatchSingleToDoItemTest(ToDoItemViewTestBase):
     """Test module for PATCH single todoitem API"""
 
-    def setUp(self):
-        self.init_db()
-
     def test_patch_valid_todoitem_no_todo_list_no_priority_updates_it(self):
         """
         Updating a valid record with valid data that does not include a todo list or
@@ -581,29 +911,30 @@ class PatchSingleToDoItemTest(ToDoItemViewTestBase):
 
         test_name = self.records["SecondItem"].name
         valid_payload = {"description": "Still the second to do item"}
-        response = client.patch(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name}),
-            data=json.dumps(valid_payload),
-            content_type="application/json",
-        )
+        # No items can need moving, so the update is not wrapped in a transaction
+        with self.assertNumQueries(2):
+            response = self.client.patch(
+                single_url(test_name),
+                data=valid_payload,
+                content_type="application/json",
+            )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+
+        # Fetch the record from the DB and validate it was updated
+        test_record = ToDoItem.objects.get(name=test_name)
+        serializer = ToDoItemSerializer(test_record)
+        self.assertEqual(data, serializer.data)
 
         # Creating the record set timestamp fields. To get a stable test,
         # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
+        data = strip_timestamps(data)
 
         # Need to inject the non-changed fields into the expected results
-        expected_results = copy(valid_payload)
-        expected_results["name"] = test_name
-        expected_results["to_do_list"] = self.records["SecondItem"].to_do_list.name
-        expected_results["priority"] = self.records["SecondItem"].priority
-        self.assertEqual(returned_data, expected_results)
-
-        # Fetch the record from the DB and validate it was updated
-        test_record = ToDoItem.objects.get(name=test_name)
-        serializer = ToDoItemSerializer(test_record)
-        self.assertEqual(response.data, serializer.data)
+        valid_payload["name"] = test_name
+        valid_payload["to_do_list"] = self.records["SecondItem"].to_do_list.name
+        valid_payload["priority"] = self.records["SecondItem"].priority
+        self.assertEqual(data, valid_payload)
 
     def test_patch_valid_todoitem_used_priority_higher_updates_it(self):
         """
@@ -614,50 +945,45 @@ class PatchSingleToDoItemTest(ToDoItemViewTestBase):
 
         test_name = self.records["SecondItem"].name
         valid_payload = {"priority": 1}
-        response = client.patch(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name}),
-            data=json.dumps(valid_payload),
-            content_type="application/json",
-        )
+        with self.assertNumQueries(8):
+            response = self.client.patch(
+                single_url(test_name),
+                data=valid_payload,
+                content_type="application/json",
+            )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
 
         # Creating the record set timestamp fields. To get a stable test,
         # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
+        data = strip_timestamps(data)
         # Inject the data for fields not included in the patch
         valid_payload["name"] = self.records["SecondItem"].name
         valid_payload["description"] = self.records["SecondItem"].description
         valid_payload["to_do_list"] = self.records["SecondItem"].to_do_list.name
-        self.assertEqual(returned_data, valid_payload)
+        self.assertEqual(data, valid_payload)
 
         # Fetch all records for the todo list and ensure they are correct.
         # Update the stored results, and the ordering,  to account for the
         # priority change
-        self.records["SecondItem"].priority = 1
-        self.records["FirstItem"].priority = 2
-        expected_records = [
-            self.records["SecondItem"],
-            self.records["FirstItem"],
-            self.records["ThirdItem"],
-        ]
-        expected_results = copy(ToDoItemSerializer(expected_records, many=True).data)
-        # The records have timestamp fields, which may have been updated if the priority was
-        # changed. To get a stable test, strip them before the comparision
-        for result in expected_results:
-            strip_timestamps(result)
+        expected_results = self.expected_results(
+            ["SecondItem", "FirstItem", "ThirdItem"],
+            {"SecondItem": {"priority": 1}, "FirstItem": {"priority": 2}},
+        )
 
-        actual_records = ToDoItem.objects.filter(to_do_list=self.to_do_list)
-        actual_results = copy(ToDoItemSerializer(actual_records, many=True).data)
-        for result in actual_results:
-            strip_timestamps(result)
+        all_records = self.fetch_all_items()
+        actual_results = self.serialize_without_timestamps(
+            all_records[self.to_do_list.id]
+        )
         self.assertEqual(expected_results, actual_results)
 
-        # Fetch the record for the other list from the DB and validate it was not altered
-        expected_serializer = ToDoItemSerializer(self.other_list_item)
-        test_record = ToDoItem.objects.get(name=self.other_list_item.name)
-        actual_serializer = ToDoItemSerializer(test_record)
-        self.assertEqual(expected_serializer.data, actual_serializer.data)
+        # Validate the record for the other list was not altered
+        actual_serializer = ToDoItemSerializer(
+            all_records[self.other_to_do_list.id], many=True
+        )
+        self.assertEqual(
+            [self.serialized_records["OtherFirstTodoItem"]], actual_serializer.data
+        )
 
     def test_patch_valid_todoitem_used_priority_lower_updates_it(self):
         """
@@ -667,50 +993,45 @@ class PatchSingleToDoItemTest(ToDoItemViewTestBase):
 
         test_name = self.records["FirstItem"].name
         valid_payload = {"priority": 3}
-        response = client.patch(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name}),
-            data=json.dumps(valid_payload),
-            content_type="application/json",
-        )
+        with self.assertNumQueries(7):
+            response = self.client.patch(
+                single_url(test_name),
+                data=valid_payload,
+                content_type="application/json",
+            )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
 
         # Creating the record set timestamp fields. To get a stable test,
         # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
+        data = strip_timestamps(data)
         # Inject the data for fields not included in the patch
         valid_payload["name"] = self.records["FirstItem"].name
         valid_payload["description"] = self.records["FirstItem"].description
         valid_payload["to_do_list"] = self.records["FirstItem"].to_do_list.name
-        self.assertEqual(returned_data, valid_payload)
+        self.assertEqual(data, valid_payload)
 
         # Fetch all records for the todo list and ensure they are correct.
         # Update the stored results, and the ordering,  to account for the
         # priority change
-        self.records["ThirdItem"].priority = 4
-        self.records["FirstItem"].priority = 3
-        expected_records = [
-            self.records["SecondItem"],
-            self.records["FirstItem"],
-            self.records["ThirdItem"],
-        ]
-        expected_results = copy(ToDoItemSerializer(expected_records, many=True).data)
-        # The records have timestamp fields, which may have been updated if the priority was
-        # changed. To get a stable test, strip them before the comparision
-        for result in expected_results:
-            strip_timestamps(result)
+        expected_results = self.expected_results(
+            ["SecondItem", "FirstItem", "ThirdItem"],
+            {"ThirdItem": {"priority": 4}, "FirstItem": {"priority": 3}},
+        )
 
-        actual_records = ToDoItem.objects.filter(to_do_list=self.to_do_list)
-        actual_results = copy(ToDoItemSerializer(actual_records, many=True).data)
-        for result in actual_results:
-            strip_timestamps(result)
+        all_records = self.fetch_all_items()
+        actual_results = self.serialize_without_timestamps(
+            all_records[self.to_do_list.id]
+        )
         self.assertEqual(expected_results, actual_results)
 
-        # Fetch the record for the other list from the DB and validate it was not altered
-        expected_serializer = ToDoItemSerializer(self.other_list_item)
-        test_record = ToDoItem.objects.get(name=self.other_list_item.name)
-        actual_serializer = ToDoItemSerializer(test_record)
-        self.assertEqual(expected_serializer.data, actual_serializer.data)
+        # Validate the record for the other list was not altered
+        actual_serializer = ToDoItemSerializer(
+            all_records[self.other_to_do_list.id], many=True
+        )
+        self.assertEqual(
+            [self.serialized_records["OtherFirstTodoItem"]], actual_serializer.data
+        )
 
     def test_patch_change_todoitem_name_returns_400(self):
         """Attempting to update the toditem name returns an error"""
@@ -718,18 +1039,17 @@ class PatchSingleToDoItemTest(ToDoItemViewTestBase):
         old_name = self.records["SecondItem"].name
         new_name = "InvalidItem"
         invalid_payload = {"name": new_name}
-        response = client.patch(
-            reverse("todolist:todoitemsingle", kwargs={"name": old_name}),
-            data=json.dumps(invalid_payload),
+        response = self.client.patch(
+            single_url(old_name),
+            data=invalid_payload,
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-        # Since 'name' is the primary key, a successful DB update would have duplicated
-        # the existing record with the new primary key value. Validate that one does
-        # NOT exist. Can't use get() here since it will raise if the record does not exist
-        records = ToDoItem.objects.filter(name=new_name)
-        self.assertEqual(len(records), 0)
+        # A successful DB update would have renamed the existing record. Validate that
+        # a record with the new name does NOT exist. Can't use get() here since it will
+        # raise if the record does not exist
+        self.assertFalse(ToDoItem.objects.filter(name=new_name).exists())
 
     def test_patch_valid_todoitem_change_list_unused_priority_updates_it(self):
         """
@@ -739,29 +1059,28 @@ class PatchSingleToDoItemTest(ToDoItemViewTestBase):
 
         test_name = self.records["SecondItem"].name
         valid_payload = {"to_do_list": self.other_to_do_list.name}
-        response = client.patch(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name}),
-            data=json.dumps(valid_payload),
+        response = self.client.patch(
+            single_url(test_name),
+            data=valid_payload,
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+
+        # Fetch the record from the DB and validate it was updated
+        test_record = ToDoItem.objects.get(name=test_name)
+        serializer = ToDoItemSerializer(test_record)
+        self.assertEqual(data, serializer.data)
 
         # Creating the record set timestamp fields. To get a stable test,
         # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
+        data = strip_timestamps(data)
 
         # Need to inject the non-changed fields into the expected results
-        expected_results = copy(valid_payload)
-        expected_results["name"] = test_name
-        expected_results["description"] = self.records["SecondItem"].description
-        expected_results["priority"] = self.records["SecondItem"].priority
-        self.assertEqual(returned_data, expected_results)
-
-        # Fetch the record from the DB and validate it was updated
-        test_record = ToDoItem.objects.get(name=test_name)
-        serializer = ToDoItemSerializer(test_record)
-        self.assertEqual(response.data, serializer.data)
+        valid_payload["name"] = test_name
+        valid_payload["description"] = self.records["SecondItem"].description
+        valid_payload["priority"] = self.records["SecondItem"].priority
+        self.assertEqual(data, valid_payload)
 
     def test_patch_valid_todoitem_change_valid_list_used_priority_moves_priorities(
         self,
@@ -773,49 +1092,51 @@ class PatchSingleToDoItemTest(ToDoItemViewTestBase):
 
         test_name = self.records["FirstItem"].name
         valid_payload = {"to_do_list": self.other_to_do_list.name}
-        response = client.patch(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name}),
-            data=json.dumps(valid_payload),
-            content_type="application/json",
-        )
+        with self.assertNumQueries(8):
+            response = self.client.patch(
+                single_url(test_name),
+                data=valid_payload,
+                content_type="application/json",
+            )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
 
         # Creating the record set timestamp fields. To get a stable test,
         # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
+        data = strip_timestamps(data)
 
         # Need to inject the non-changed fields into the expected results
-        expected_results = copy(valid_payload)
-        expected_results["name"] = test_name
-        expected_results["description"] = self.records["FirstItem"].description
-        expected_results["priority"] = self.records["FirstItem"].priority
-        self.assertEqual(returned_data, expected_results)
+        valid_payload["name"] = test_name
+        valid_payload["description"] = self.records["FirstItem"].description
+        valid_payload["priority"] = self.records["FirstItem"].priority
+        self.assertEqual(data, valid_payload)
 
         # Fetch all records for the todo list and ensure they are correct.
         # Update the stored results, and the ordering,  to account for the
         # priority change
-        self.records["FirstItem"].to_do_list = self.other_to_do_list
-        self.other_list_item.priority = 2
-        expected_records = [self.records["FirstItem"], self.other_list_item]
-        expected_results = copy(ToDoItemSerializer(expected_records, many=True).data)
-        # The records have timestamp fields, which may have been updated if the priority was
-        # changed. To get a stable test, strip them before the comparision
-        for result in expected_results:
-            strip_timestamps(result)
-
-        actual_records = ToDoItem.objects.filter(to_do_list=self.other_to_do_list)
-        actual_results = copy(ToDoItemSerializer(actual_records, many=True).data)
-        for result in actual_results:
-            strip_timestamps(result)
+        expected_results = self.expected_results(
+            ["FirstItem", "OtherFirstTodoItem"],
+            {
+                "FirstItem": {"to_do_list": self.other_to_do_list.name},
+                "OtherFirstTodoItem": {"priority": 2},
+            },
+        )
+
+        all_records = self.fetch_all_items()
+        actual_results = self.serialize_without_timestamps(
+            all_records[self.other_to_do_list.id]
+        )
         self.assertEqual(expected_results, actual_results)
 
         # Fetch the records remaining in the original todo list from the DB and
         # validate they were not altered
-        expected_records = [self.records["SecondItem"], self.records["ThirdItem"]]
-        expected_results = ToDoItemSerializer(expected_records, many=True).data
-        actual_records = ToDoItem.objects.filter(to_do_list=self.to_do_list)
-        actual_results = ToDoItemSerializer(actual_records, many=True).data
+        expected_results = [
+            self.serialized_records["SecondItem"],
+            self.serialized_records["ThirdItem"],
+        ]
+        actual_results = ToDoItemSerializer(
+            all_records[self.to_do_list.id], many=True
+        ).data
         self.assertEqual(expected_results, actual_results)
 
     def test_patch_change_todoitem_invalid_list_returns_400(self):
@@ -826,44 +1147,38 @@ class PatchSingleToDoItemTest(ToDoItemViewTestBase):
 
         test_name = self.records["SecondItem"].name
         invalid_payload = {"to_do_list": "I_do_not_exist"}
-        response = client.patch(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name}),
-            data=json.dumps(invalid_payload),
+        response = self.client.patch(
+            single_url(test_name),
+            data=invalid_payload,
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
         # Fetch the record and ensure it is still in the orignal todo list
-        record = ToDoItem.objects.get(name=test_name)
-        self.assertEqual(self.records["SecondItem"].to_do_list, record.to_do_list)
+        to_do_list_id = ToDoItem.objects.values_list("to_do_list_id", flat=True).get(
+            name=test_name
+        )
+        self.assertEqual(self.records["SecondItem"].to_do_list_id, to_do_list_id)
 
 
 class DeleteSingleToDoItemTest(ToDoItemViewTestBase):
     """Test module for DELETE single todoitem API"""
 
-    def setUp(self):
-        self.init_db()
-
     def test_delete_valid_todoitem_removes_it(self):
         """Deleting a valid record removes it"""
 
         test_name = self.records["SecondItem"].name
-        response = client.delete(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name})
-        )
+        response = self.client.delete(single_url(test_name))
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertIsNone(response.data)
 
         # Fetch the record from the DB and validate it no longer exists. Can't
         # use get() here since it will raise if the record does not exist
-        records = ToDoItem.objects.filter(name=test_name)
-        self.assertEqual(len(records), 0)
+        self.assertFalse(ToDoItem.objects.filter(name=test_name).exists())
 
     def test_delete_non_existent_name_returns_404(self):
         """Attempting to delete a non-existent toditem returns an error"""
 
         test_name = "InvalidItem"
-        response = client.delete(
-            reverse("todolist:todoitemsingle", kwargs={"name": test_name})
-        )
+        response = self.client.delete(single_url(test_name))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,17 +1,16 @@
 """ Tests for todo list view methods """
 import json
-from copy import copy
+from contextlib import contextmanager
 
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
 
 from ..models import ToDoItem, ToDoList
 from ..serializers import ToDoItemSerializer, ToDoListSerializer
-from .test_utils import strip_timestamps
-
-# initialize the APIClient app
-client = Client()
+from .test_utils import strip_timestamps, strip_timestamps_many
 
 
 def init_db() -> dict:
@@ -21,62 +20,173 @@ def init_db() -> dict:
         "SecondList": "Second to do list",
         "ThirdList": "Third to do list",
     }
-    result = {}
-    for name, description in test_data.items():
-        result[name] = ToDoList.objects.create(name=name, description=description)
-    return result
+    records = ToDoList.objects.bulk_create(
+        ToDoList(name=name, description=description)
+        for name, description in test_data.items()
+    )
+    return {record.name: record for record in records}
+
+
+@contextmanager
+def change_after_version_query(change):
+    """
+    Make a change right after the first query finding the version of some records, as a
+    concurrent request could
+    """
+    changed = False
+
+    def change_after_query(execute, sql, params, many, context):
+        nonlocal changed
+        result = execute(sql, params, many, context)
+        if not changed and "MAX(" in sql:
+            changed = True
+            change()
+        return result
+
+    with connection.execute_wrapper(change_after_query):
+        yield
+
+
+class ToDoListViewTestBase(TestCase):
+    """Base class for ToDoList view tests with common functionality"""
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Initialize DB for tests. This runs once per test class. Each test runs in its own
+        transaction and gets its own copy of the records, so tests may modify them
+        """
+        cls.records = init_db()
+        # Serialize the records once. Tests compare against these
+        cls.serialized_records = dict(
+            zip(cls.records, ToDoListSerializer(cls.records.values(), many=True).data)
+        )
 
 
-class GetAllToDoListTest(TestCase):
+class GetAllToDoListTest(ToDoListViewTestBase):
     """Test module for GET all to do lists API"""
 
-    def setUp(self):
-        self.records = init_db()
-
     def test_get_all_todo_lists_returns_records(self):
         """Get all records"""
-        response = client.get(reverse("todolist:todolistmult"))
+        response = self.client.get(reverse("todolist:todolistmult"))
+        self.assertEqual(response.data, list(self.serialized_records.values()))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_all_todo_lists_without_timestamps_omits_them(self):
+        """Get all records, asking for timestamps to be left out"""
+        # Fetch with timestamps first, to show cached results for them are not reused
+        self.client.get(reverse("todolist:todolistmult"))
+        response = self.client.get(
+            reverse("todolist:todolistmult"), {"timestamps": "false"}
+        )
+        expected_results = strip_timestamps_many(self.serialized_records.values())
+        self.assertEqual(response.data, expected_results)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_all_todo_lists_after_changes_returns_current_records(self):
+        """Results of a previous get are not returned once the records change"""
+        self.client.get(reverse("todolist:todolistmult"))
+
+        self.records["FirstList"].description = "Changed first to do list"
+        self.records["FirstList"].save()
+        self.records.pop("ThirdList").delete()
+
+        response = self.client.get(reverse("todolist:todolistmult"))
         serializer = ToDoListSerializer(self.records.values(), many=True)
         self.assertEqual(response.data, serializer.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_get_all_todo_lists_unchanged_returns_304(self):
+        """Getting records again with the ETag of the last get returns no body"""
+        # Start without cached results, so the first get builds them from the records
+        cache.clear()
+        response = self.client.get(reverse("todolist:todolistmult"))
+        etag = response.headers["ETag"]
+
+        # Only the query to find whether the records changed is needed
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("todolist:todolistmult"), HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+        self.records["FirstList"].description = "Changed first to do list"
+        self.records["FirstList"].save()
+        response = self.client.get(
+            reverse("todolist:todolistmult"), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(
+            response.data[0]["description"], self.records["FirstList"].description
+        )
+
+    def test_get_all_todo_lists_changed_while_listing_tags_records_returned(self):
+        """
+        Records changed after their version is found but before they are fetched are
+        returned, cached and tagged under their own version
+        """
+        cache.clear()
+        first_list = self.records["FirstList"]
 
-class GetSingleToDoListTest(TestCase):
-    """Test module for GET single todolist API"""
+        def change():
+            first_list.description = "Changed first to do list"
+            first_list.save()
+
+        with change_after_version_query(change):
+            response = self.client.get(reverse("todolist:todolistmult"))
+        self.assertEqual(response.data[0]["description"], first_list.description)
 
-    def setUp(self):
-        self.records = init_db()
+        # The records returned are the current ones, so their ETag matches
+        response = self.client.get(
+            reverse("todolist:todolistmult"),
+            HTTP_IF_NONE_MATCH=response.headers["ETag"],
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class GetSingleToDoListTest(ToDoListViewTestBase):
+    """Test module for GET single todolist API"""
 
     def test_get_valid_single_todolist_returns_it(self):
         """Get single record that exists"""
         test_name = "SecondList"
-        response = client.get(
+        response = self.client.get(
             reverse("todolist:todolistsingle", kwargs={"name": test_name})
         )
-        serializer = ToDoListSerializer(self.records[test_name])
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data, self.serialized_records[test_name])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_single_todolist_without_timestamps_omits_them(self):
+        """Get single record that exists, asking for timestamps to be left out"""
+        test_name = "SecondList"
+        response = self.client.get(
+            reverse("todolist:todolistsingle", kwargs={"name": test_name}),
+            {"timestamps": "false"},
+        )
+        self.assertEqual(
+            response.data, {"name": test_name, "description": "Second to do list"}
+        )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     def test_get_invalid_single_todolist_returns_404(self):
         """Get single record that does not exist"""
-        response = client.get(
+        response = self.client.get(
             reverse("todolist:todolistsingle", kwargs={"name": "invalid"})
         )
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
-class PostSingleToDoListTest(TestCase):
+class PostSingleToDoListTest(ToDoListViewTestBase):
     """Test module for POST single todolist API"""
 
-    def setUp(self):
-        self.records = init_db()
-
     def test_post_valid_todolist_inserts_it(self):
         """Posting a valid record with an unused name inserts it"""
 
         test_name = "FourthList"
         valid_payload = {"name": test_name, "description": "Fourth to do list"}
-        response = client.post(
+        response = self.client.post(
             reverse("todolist:todolistmult"),
             data=json.dumps(valid_payload),
             content_type="application/json",
@@ -85,8 +195,7 @@ class PostSingleToDoListTest(TestCase):
 
         # Creating the record set timestamp fields. To get a stable test,
         # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
+        returned_data = strip_timestamps(response.data)
         self.assertEqual(returned_data, valid_payload)
 
         # Fetch the record from the DB and validate it was inserted
@@ -98,7 +207,7 @@ class PostSingleToDoListTest(TestCase):
         """Posting an invalid record returns a 400"""
 
         invalid_payload = {"name": "", "description": "Invalid to do list"}
-        response = client.post(
+        response = self.client.post(
             reverse("todolist:todolistmult"),
             data=json.dumps(invalid_payload),
             content_type="application/json",
@@ -110,7 +219,7 @@ class PostSingleToDoListTest(TestCase):
 
         test_name = self.records["SecondList"].name
         invalid_payload = {"name": test_name, "description": "Invalid to do list"}
-        response = client.post(
+        response = self.client.post(
             reverse("todolist:todolistmult"),
             data=json.dumps(invalid_payload),
             content_type="application/json",
@@ -119,15 +228,58 @@ class PostSingleToDoListTest(TestCase):
 
         # Validate that the duplicate record was not inserted. Can't use get()
         # here since it will raise if the insert succeeded
-        records = ToDoList.objects.filter(name=test_name)
-        self.assertEqual(len(records), 1)
+        self.assertEqual(ToDoList.objects.filter(name=test_name).count(), 1)
 
 
-class PutSingleToDoListTest(TestCase):
-    """Test module for PUT single todolist API"""
+class PostMultipleToDoListTest(ToDoListViewTestBase):
+    """Test module for POST multiple todolists API"""
+
+    def test_post_valid_todolists_inserts_them(self):
+        """Posting a list of valid records with unused names inserts all of them"""
+
+        valid_payload = [
+            {"name": "FourthList", "description": "Fourth to do list"},
+            {"name": "FifthList", "description": "Fifth to do list"},
+        ]
+        response = self.client.post(
+            reverse("todolist:todolistmult"),
+            data=json.dumps(valid_payload),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # Fetch the records from the DB and validate they were inserted. Lists are
+        # sorted in alphabetical order, so the fifth list sorts first
+        test_records = ToDoList.objects.filter(name__in=["FourthList", "FifthList"])
+        serializer = ToDoListSerializer(test_records, many=True)
+        self.assertEqual(list(reversed(response.data)), serializer.data)
+
+        # Creating the records set timestamp fields. To get a stable test,
+        # strip them before doing the comparision
+        returned_data = strip_timestamps_many(response.data)
+        self.assertEqual(returned_data, valid_payload)
+
+    def test_post_todolists_duplicate_names_returns_400(self):
+        """Posting a list of records where two have the same name returns a 400"""
 
-    def setUp(self):
-        self.records = init_db()
+        test_name = "FourthList"
+        invalid_payload = [
+            {"name": test_name, "description": "Fourth to do list"},
+            {"name": test_name, "description": "Fourth to do list again"},
+        ]
+        response = self.client.post(
+            reverse("todolist:todolistmult"),
+            data=json.dumps(invalid_payload),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Validate that neither record was inserted
+        self.assertFalse(ToDoList.objects.filter(name=test_name).exists())
+
+
+class PutSingleToDoListTest(ToDoListViewTestBase):
+    """Test module for PUT single todolist API"""
 
     def test_put_valid_todolist_updates_it(self):
         """Updating a valid record with valid data updatess it"""
@@ -137,7 +289,7 @@ class PutSingleToDoListTest(TestCase):
             "name": test_name,
             "description": "Still the second to do list",
         }
-        response = client.put(
+        response = self.client.put(
             reverse("todolist:todolistsingle", kwargs={"name": test_name}),
             data=json.dumps(valid_payload),
             content_type="application/json",
@@ -146,8 +298,7 @@ class PutSingleToDoListTest(TestCase):
 
         # Creating the record set timestamp fields. To get a stable test,
         # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
+        returned_data = strip_timestamps(response.data)
         self.assertEqual(returned_data, valid_payload)
 
         # Fetch the record from the DB and validate it was updated
@@ -161,32 +312,28 @@ class PutSingleToDoListTest(TestCase):
         old_name = self.records["SecondList"].name
         new_name = "InvalidList"
         invalid_payload = {"name": new_name, "description": "Invalid to do list"}
-        response = client.put(
+        response = self.client.put(
             reverse("todolist:todolistsingle", kwargs={"name": old_name}),
             data=json.dumps(invalid_payload),
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-        # Since 'name' is the primary key, a successful DB update would have duplicated
-        # the existing record with the new primary key value. Validate that one does
-        # NOT exist. Can't use get() here since it will raise if the record does not exist
-        records = ToDoList.objects.filter(name=new_name)
-        self.assertEqual(len(records), 0)
+        # A successful DB update would have renamed the existing record. Validate that
+        # a record with the new name does NOT exist. Can't use get() here since it will
+        # raise if the record does not exist
+        self.assertFalse(ToDoList.objects.filter(name=new_name).exists())
 
 
-class PatchSingleToDoListTest(TestCase):
+class PatchSingleToDoListTest(ToDoListViewTestBase):
     """Test module for PATCH single todolist API"""
 
-    def setUp(self):
-        self.records = init_db()
-
     def test_patch_valid_todolist_updates_it(self):
         """Updating a valid record with valid data updatess it"""
 
         test_name = self.records["SecondList"].name
         valid_payload = {"description": "Still the second to do list"}
-        response = client.patch(
+        response = self.client.patch(
             reverse("todolist:todolistsingle", kwargs={"name": test_name}),
             data=json.dumps(valid_payload),
             content_type="application/json",
@@ -195,13 +342,11 @@ class PatchSingleToDoListTest(TestCase):
 
         # Creating the record set timestamp fields. To get a stable test,
         # strip them before doing the comparision
-        returned_data = copy(response.data)
-        strip_timestamps(returned_data)
+        returned_data = strip_timestamps(response.data)
 
         # Need to inject the non-changed fields into the expected results
-        expected_results = copy(valid_payload)
-        expected_results["name"] = test_name
-        self.assertEqual(returned_data, expected_results)
+        valid_payload["name"] = test_name
+        self.assertEqual(returned_data, valid_payload)
 
         # Fetch the record from the DB and validate it was updated
         test_record = ToDoList.objects.get(name=test_name)
@@ -214,31 +359,27 @@ class PatchSingleToDoListTest(TestCase):
         old_name = self.records["SecondList"].name
         new_name = "InvalidList"
         invalid_payload = {"name": new_name}
-        response = client.patch(
+        response = self.client.patch(
             reverse("todolist:todolistsingle", kwargs={"name": old_name}),
             data=json.dumps(invalid_payload),
             content_type="application/json",
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-        # Since 'name' is the primary key, a successful DB update would have duplicated
-        # the existing record with the new primary key value. Validate that one does
-        # NOT exist. Can't use get() here since it will raise if the record does not exist
-        records = ToDoList.objects.filter(name=new_name)
-        self.assertEqual(len(records), 0)
+        # A successful DB update would have renamed the existing record. Validate that
+        # a record with the new name does NOT exist. Can't use get() here since it will
+        # raise if the record does not exist
+        self.assertFalse(ToDoList.objects.filter(name=new_name).exists())
 
 
-class DeleteSingleToDoListTest(TestCase):
+class DeleteSingleToDoListTest(ToDoListViewTestBase):
     """Test module for DELETE single todolist API"""
 
-    def setUp(self):
-        self.records = init_db()
-
     def test_delete_valid_todolist_removes_it(self):
         """Deleting a valid record removes it"""
 
         test_name = self.records["SecondList"].name
-        response = client.delete(
+        response = self.client.delete(
             reverse("todolist:todolistsingle", kwargs={"name": test_name})
         )
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
@@ -246,8 +387,7 @@ class DeleteSingleToDoListTest(TestCase):
 
         # Fetch the record from the DB and validate it no longer exists. Can't
         # use get() here since it will raise if the record does not exist
-        records = ToDoList.objects.filter(name=test_name)
-        self.assertEqual(len(records), 0)
+        self.assertFalse(ToDoList.objects.filter(name=test_name).exists())
 
     def test_delete_todolist_removes_items(self):
         """Deleteing a todolist also removes all todoitems in the list"""
@@ -265,80 +405,168 @@ class DeleteSingleToDoListTest(TestCase):
             priority=2,
         )
 
-        response = client.delete(
+        response = self.client.delete(
             reverse("todolist:todolistsingle", kwargs={"name": test_list.name})
         )
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertIsNone(response.data)
 
         # Fetch the items in the list and validate that they are gone
-        records = ToDoItem.objects.filter(to_do_list=test_list)
-        self.assertEqual(len(records), 0)
+        self.assertFalse(ToDoItem.objects.filter(to_do_list=test_list).exists())
 
     def test_delete_non_existent_name_returns_404(self):
         """Attempting to delete a non-existent todlist returns an error"""
 
         test_name = "InvalidList"
-        response = client.delete(
+        response = self.client.delete(
             reverse("todolist:todolistsingle", kwargs={"name": test_name})
         )
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
-class GettoDoListWithItemsTest(TestCase):
+class GettoDoListWithItemsTest(ToDoListViewTestBase):
     """Test fetching ToDoLists with items included"""
 
-    def setUp(self):
-        self.todolists = init_db()
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
         # Create second item first, to show sorting works properly
-        self.second_item = ToDoItem.objects.create(
-            name="SecondItem",
-            description="Second Test Item",
-            to_do_list=self.todolists["SecondList"],
-            priority=2,
-        )
-        self.first_item = ToDoItem.objects.create(
-            name="FirstItem",
-            description="First Test Item",
-            to_do_list=self.todolists["SecondList"],
-            priority=1,
+        cls.second_item, cls.first_item = ToDoItem.objects.bulk_create(
+            [
+                ToDoItem(
+                    name="SecondItem",
+                    description="Second Test Item",
+                    to_do_list=cls.records["SecondList"],
+                    priority=2,
+                ),
+                ToDoItem(
+                    name="FirstItem",
+                    description="First Test Item",
+                    to_do_list=cls.records["SecondList"],
+                    priority=1,
+                ),
+            ]
         )
 
     def test_get_valid_todo_list_no_items_returns_it(self):
         """Fetching a todo list with no items works"""
 
         test_name = "FirstList"
-        response = client.get(
+        response = self.client.get(
             reverse("todolist:todolistwithitems", kwargs={"name": test_name})
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-        serializer = ToDoListSerializer(self.todolists[test_name])
-        self.assertEqual(response.data, {"list": serializer.data, "items": []})
+        self.assertEqual(
+            response.data, {"list": self.serialized_records[test_name], "items": []}
+        )
 
     def test_get_valid_todo_list_with_items_returns_it(self):
         """Fetching a todo list with no items works"""
 
         test_name = "SecondList"
-        response = client.get(
+        response = self.client.get(
             reverse("todolist:todolistwithitems", kwargs={"name": test_name})
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-        list_serializer = ToDoListSerializer(self.todolists[test_name])
         first_item_serializer = ToDoItemSerializer(self.first_item)
         second_item_serializer = ToDoItemSerializer(self.second_item)
         self.assertEqual(
             response.data,
             {
-                "list": list_serializer.data,
+                "list": self.serialized_records[test_name],
                 "items": [first_item_serializer.data, second_item_serializer.data],
             },
         )
+        # The items are rendered without the item serializer, so also check their fields
+        # come out in the same order
+        for item in response.data["items"]:
+            self.assertEqual(list(item), list(first_item_serializer.data))
+
+    def test_get_todo_list_with_items_without_timestamps_omits_them(self):
+        """Fetching a todo list with items can leave out all the timestamps"""
+
+        test_name = "SecondList"
+        response = self.client.get(
+            reverse("todolist:todolistwithitems", kwargs={"name": test_name}),
+            {"timestamps": "false"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data = response.json()
+        self.assertEqual(data["list"]["name"], test_name)
+        self.assertEqual(
+            [item["name"] for item in data["items"]], ["FirstItem", "SecondItem"]
+        )
+        for record in [data["list"]] + data["items"]:
+            self.assertNotIn("created_at", record)
+            self.assertNotIn("updated_at", record)
+        self.assertEqual(
+            list(data["items"][0]), ["name", "description", "to_do_list", "priority"]
+        )
+
+    def test_get_todo_list_with_items_does_not_query_per_item(self):
+        """Fetching a todo list with items takes one query for the list and one for items"""
+
+        # Results of other tests may be cached, which would skip the query for items
+        cache.clear()
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse("todolist:todolistwithitems", kwargs={"name": "SecondList"})
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["items"]), 2)
+
+    def test_get_todo_list_with_items_unchanged_returns_304(self):
+        """Fetching a todo list with items again with the ETag of the last fetch"""
+
+        url = reverse("todolist:todolistwithitems", kwargs={"name": "SecondList"})
+        # Start without cached results, so the first fetch builds them from the records
+        cache.clear()
+        etag = self.client.get(url).headers["ETag"]
+
+        # Only the query for the list, which also finds whether the items changed
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+        # Changing an item does not change the list, but must still change the results
+        self.first_item.description = "Changed first test item"
+        self.first_item.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(
+            response.data["items"][0]["description"], self.first_item.description
+        )
+
+    def test_get_todo_list_with_items_changed_while_fetching_tags_items_returned(self):
+        """
+        Items changed after the todo list is fetched but before they are fetched are
+        returned, cached and tagged under their own version
+        """
+        cache.clear()
+        url = reverse("todolist:todolistwithitems", kwargs={"name": "SecondList"})
+
+        def change():
+            self.first_item.description = "Changed first test item"
+            self.first_item.save()
+
+        with change_after_version_query(change):
+            response = self.client.get(url)
+        self.assertEqual(
+            response.data["items"][0]["description"], self.first_item.description
+        )
+
+        # The items returned are the current ones, so their ETag matches
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response.headers["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
 
     def test_get_invalid_todolist_with_items_returns_404(self):
         """Feching a todo list with items where the list does not exist"""
-        response = client.get(
+        response = self.client.get(
             reverse("todolist:todolistwithitems", kwargs={"name": "invalid"})
         )
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,29 +1,33 @@
 """ URL paths to support the todo list app """
-from django.urls import path
+from django.urls import path, register_converter
 from rest_framework.urlpatterns import format_suffix_patterns
 
-from todolist import views
+from todolist import converters, views
+
+register_converter(converters.NameConverter, "name")
 
 app_name = "todolist"
 
+# Patterns are tried in order, so the ones for single records, which get the most
+# requests, come first
 urlpatterns = [
-    path("api/v1/todolist/", views.ToDoListMult.as_view(), name="todolistmult"),
     path(
-        "api/v1/todolist/<slug:name>/",
+        "api/v1/todoitem/<name:name>/",
+        views.ToDoItemSingle.as_view(),
+        name="todoitemsingle",
+    ),
+    path(
+        "api/v1/todolist/<name:name>/",
         views.ToDoListSingle.as_view(),
         name="todolistsingle",
     ),
+    path("api/v1/todoitem/", views.ToDoItemMult.as_view(), name="todoitemmult"),
+    path("api/v1/todolist/", views.ToDoListMult.as_view(), name="todolistmult"),
     path(
-        "api/v1/todolist/<slug:name>/with_items",
+        "api/v1/todolist/<name:name>/with_items",
         views.ToDoListWithItems.as_view(),
         name="todolistwithitems",
     ),
-    path("api/v1/todoitem/", views.ToDoItemMult.as_view(), name="todoitemmult"),
-    path(
-        "api/v1/todoitem/<slug:name>/",
-        views.ToDoItemSingle.as_view(),
-        name="todoitemsingle",
-    ),
 ]
 
 urlpatterns = format_suffix_patterns(urlpatterns)
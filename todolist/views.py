@@ -1,44 +1,268 @@
 """ URL views for todo list and item related tasks """
+import hashlib
+from datetime import datetime
+
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
 from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import DateTimeField
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
 
 from .models import ToDoItem, ToDoList
-from .serializers import ToDoItemSerializer, ToDoListSerializer
+from .serializers import (
+    TIMESTAMP_FIELDS,
+    ToDoItemReadSerializer,
+    ToDoItemSerializer,
+    ToDoListReadSerializer,
+    ToDoListSerializer,
+)
+
+
+class TimestampsContextMixin:  # pylint: disable=too-few-public-methods
+    """
+    Let clients leave the timestamp fields out of responses by passing the query
+    parameter 'timestamps=false'
+    """
+
+    def get_serializer_context(self):
+        """Add whether to include timestamps. Overrides a method in the base class"""
+        context = super().get_serializer_context()
+        context["include_timestamps"] = self.request.query_params.get(
+            "timestamps", ""
+        ).lower() not in ("false", "0")
+        return context
+
+
+class ReadSerializerMixin:  # pylint: disable=too-few-public-methods
+    """
+    Use a cheaper read only serializer for requests that do not modify data. Views
+    using this mixin must set 'read_serializer_class'
+    """
+
+    read_serializer_class = None
+
+    def get_serializer_class(self):
+        """
+        Select the serializer to use based on the request method. Overrides a method in the
+        base class
+        """
+        if self.request.method in SAFE_METHODS:
+            return self.read_serializer_class
+        return super().get_serializer_class()
+
+
+class VersionedResponseMixin:  # pylint: disable=too-few-public-methods
+    """
+    Tag the response to a GET with an ETag built from a version of its data, and cache
+    the data under that version. Clients sending the ETag back in 'If-None-Match' get a
+    304 response with no body if the data has not changed. The version must change
+    whenever the data does
+    NOTE: Versions built from 'updated_at' timestamps are not exact. The timestamp is set
+    when a record is saved, not when the change commits, so a change that commits after
+    one saved later can leave the version as it was. Until the data changes again,
+    clients sending the old ETag then get a 304, and others can get cached data without
+    the change until it times out
+    """
+
+    cache_timeout = 300
+
+    @staticmethod
+    def build_version(*parts) -> str:
+        """Join the values identifying a version of some data into a cache key"""
+        return ":".join(
+            str(part.timestamp() if isinstance(part, datetime) else part)
+            for part in parts
+        )
+
+    @staticmethod
+    def version_etag(request, version) -> str:
+        """Build the ETag for a version of the data"""
+        # The same data renders differently for each format, so it gets its own tag
+        tag = f"{version}:{request.accepted_renderer.format}"
+        return quote_etag(hashlib.md5(tag.encode(), usedforsecurity=False).hexdigest())
+
+    def versioned_response(self, request, version, get_data):
+        """
+        Return the response for data with the given version. 'get_data' is only called if
+        the client does not have the data and it is not in the cache. It returns the data
+        along with the version of the records it was built from. Those can have changed
+        since the given version was found, so the data is cached and tagged under its own
+        version, never under one it was not built from
+        """
+        response = get_conditional_response(
+            request, etag=self.version_etag(request, version)
+        )
+        if response is None:
+            data = cache.get(version)
+            if data is None:
+                data, version = get_data()
+                cache.set(version, data, self.cache_timeout)
+            response = Response(data)
+        response.headers["ETag"] = self.version_etag(request, version)
+        return response
+
+
+class CachedListMixin(VersionedResponseMixin):  # pylint: disable=too-few-public-methods
+    """
+    Cache the serialized results of listing all records. The version is built from the
+    record count and latest update timestamp, so any change to the records produces a new
+    cache key instead of requiring the cache to be invalidated. Views using this mixin
+    must list a model with an 'updated_at' field that is set on every change. The
+    version, and so the ETag, can miss a change that commits late; see the note on
+    VersionedResponseMixin
+    """
+
+    def list(self, request, *args, **kwargs):
+        """
+        List all records, using cached results if available. Overrides a method in the base
+        class
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        include_timestamps = self.get_serializer_context().get(
+            "include_timestamps", True
+        )
+
+        def list_version(count, last_updated):
+            return self.build_version(
+                queryset.model._meta.label_lower,
+                "list",
+                count,
+                last_updated,
+                include_timestamps,
+            )
+
+        def get_data():
+            # The version is built from the records serialized, so it matches them even
+            # if they changed after the version below was found
+            records = list(queryset)
+            last_updated = max((record.updated_at for record in records), default=None)
+            data = self.get_serializer(records, many=True).data
+            return data, list_version(len(records), last_updated)
+
+        stamp = queryset.aggregate(count=Count("pk"), last_updated=Max("updated_at"))
+        return self.versioned_response(
+            request, list_version(stamp["count"], stamp["last_updated"]), get_data
+        )
+
 
+class BulkCreateMixin:  # pylint: disable=too-few-public-methods
+    """Allow creating multiple records in one request by posting a list of them"""
 
-class ToDoListMult(generics.ListCreateAPIView):
+    def get_serializer(self, *args, **kwargs):
+        """
+        Use a list serializer when the request data is a list. Overrides a method in the
+        base class
+        """
+        if isinstance(kwargs.get("data"), list):
+            kwargs["many"] = True
+        return super().get_serializer(*args, **kwargs)
+
+
+# pylint: disable-next=too-many-ancestors
+class ToDoListMult(
+    CachedListMixin,
+    ReadSerializerMixin,
+    TimestampsContextMixin,
+    BulkCreateMixin,
+    generics.ListCreateAPIView,
+):
     """Views for URLs that do not specify a todo list. Use standard behavior for all"""
 
     queryset = ToDoList.objects.all()
     serializer_class = ToDoListSerializer
+    read_serializer_class = ToDoListReadSerializer
 
 
-class ToDoListSingle(generics.RetrieveUpdateDestroyAPIView):
+# pylint: disable-next=too-many-ancestors
+class ToDoListSingle(
+    ReadSerializerMixin, TimestampsContextMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """Views for URLs that specify a particular todo list. Use standard behavior for all"""
 
     queryset = ToDoList.objects.all()
     serializer_class = ToDoListSerializer
+    read_serializer_class = ToDoListReadSerializer
     lookup_field = "name"
 
 
-class ToDoListWithItems(generics.RetrieveAPIView):
+class ToDoListWithItems(
+    VersionedResponseMixin, TimestampsContextMixin, generics.RetrieveAPIView
+):
     """View for URL to fetch a todo list and the items in the list"""
 
-    queryset = ToDoList.objects.all()
-    serializer_class = ToDoListSerializer
+    # Changing the items does not change the todo list's own timestamp, so fetch what
+    # identifies the state of its items along with it, to build the version from
+    queryset = ToDoList.objects.annotate(
+        item_count=Count("todoitem"), items_updated=Max("todoitem__updated_at")
+    )
+    serializer_class = ToDoListReadSerializer
     lookup_field = "name"
 
     def get(self, request, *args, **kwargs):
         """Retrieve the todolist with all of its items in priority order"""
         to_do_list = self.get_object()
-        to_do_list_serializer = ToDoListSerializer(to_do_list)
+        context = self.get_serializer_context()
+        version = self.with_items_version(
+            to_do_list, to_do_list.item_count, to_do_list.items_updated, context
+        )
+        return self.versioned_response(
+            request, version, lambda: self.list_with_items(to_do_list, context)
+        )
+
+    def with_items_version(self, to_do_list, item_count, items_updated, context) -> str:
+        """Build the version of the todo list with items in the given state"""
+        return self.build_version(
+            ToDoList._meta.label_lower,
+            "with_items",
+            to_do_list.pk,
+            to_do_list.updated_at,
+            item_count,
+            items_updated,
+            context["include_timestamps"],
+        )
 
-        to_do_items = ToDoItem.objects.filter(to_do_list=to_do_list)
-        to_do_items_serializer = ToDoItemSerializer(to_do_items, many=True)
-        return Response(
-            {"list": to_do_list_serializer.data, "items": to_do_items_serializer.data}
+    def list_with_items(self, to_do_list, context):
+        """
+        Build the data for the todo list and its items, along with its version. The items
+        are fetched after the todo list, so their part of the version is taken from the
+        items fetched rather than from the todo list
+        """
+        to_do_list_serializer = ToDoListReadSerializer(to_do_list, context=context)
+
+        # The items are only rendered, so fetch them as plain dicts instead of model
+        # instances and skip serializing them. All of them are in the fetched todo list.
+        # Each item is built with its fields in the order the item serializer renders
+        # them, and the timestamps formatted as it does, so the results match. They are
+        # always fetched, since the version needs them
+        item_rows = list(
+            ToDoItem.objects.filter(to_do_list=to_do_list)
+            .order_by("priority")
+            .values("name", "description", "priority", *TIMESTAMP_FIELDS)
+        )
+        items_updated = max((row["updated_at"] for row in item_rows), default=None)
+        format_timestamp = DateTimeField().to_representation
+        to_do_items = []
+        for row in item_rows:
+            to_do_item = {
+                "name": row["name"],
+                "description": row["description"],
+                "to_do_list": to_do_list.name,
+                "priority": row["priority"],
+            }
+            if context["include_timestamps"]:
+                for field_name in TIMESTAMP_FIELDS:
+                    to_do_item[field_name] = format_timestamp(row[field_name])
+            to_do_items.append(to_do_item)
+        data = {"list": to_do_list_serializer.data, "items": to_do_items}
+        version = self.with_items_version(
+            to_do_list, len(item_rows), items_updated, context
         )
+        return data, version
 
 
 class MoveExistingItemsMixin:  # pylint: disable=too-few-public-methods
@@ -48,45 +272,113 @@ class MoveExistingItemsMixin:  # pylint: disable=too-few-public-methods
     WARNING: All methods in this class must be called from methods that are atomic
     """
 
-    def move_items_priority_if_needed(self, item_data) -> None:
+    def move_items_priority_if_needed(self, items_data) -> None:
         """
-        Find items that need to have their priority lowered to make room for an item
-        with the given priority, and update them. The item data must already be validated
+        Find items that need to have their priority lowered to make room for items with
+        the given priorities, and update them. The item data must already be validated
         NOTE: In todo lists, lower priority items have a higher number
         """
+        if not items_data:
+            return
+        self.lock_lists(items_data)
+        # Making room in priority order ensures each item lands at exactly the priority
+        # requested, since making room for one never moves items past an earlier one
+        for item_data in sorted(items_data, key=lambda data: data["priority"]):
+            self.make_room_for_item(item_data)
+
+    @staticmethod
+    def lock_lists(items_data) -> None:
+        """
+        Lock the todo lists the given items belong to
+        """
+        # Rows can't be locked in the window queries that find the items to move, so each
+        # item's todo list row is locked instead of the item rows. It is locked before
+        # anything is read, even if no priority is in use yet, so concurrent changes to
+        # the priorities of the same todo list wait for this one to finish instead of
+        # clashing on the uniqueness constraint. All the todo lists are locked in one
+        # query in primary key order, so requests changing several never wait on each
+        # other in opposite orders
+        list(
+            ToDoList.objects.select_for_update()
+            .filter(pk__in={item_data["to_do_list"].pk for item_data in items_data})
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def make_room_for_item(self, item_data) -> None:
+        """
+        Lower the priority of the items in the way of the given one. Its todo list must
+        already be locked
+        """
         # Items are moved by increasing each priority value by 1 (which lowers the priority).
-        # If that results in a clash, the next item is also moved, etc. Items are fetched in
-        # priority order by default, so this is a linear process
+        # If that results in a clash, the next item is also moved, etc. so the items to move
+        # are the run of used priorities starting at the wanted one. Most of the time the
+        # wanted priority is unused, and then the run is empty
+        to_do_list = item_data["to_do_list"]
         priority_to_move = item_data["priority"]
-        items_to_save = []
-        items_to_move = self.get_queryset().filter(
-            to_do_list=item_data["to_do_list"], priority__gte=priority_to_move
-        )
-        for item in items_to_move:
-            if item.priority > priority_to_move:
+        run, max_priority = ToDoItem.priority_run(to_do_list, priority_to_move)
+        run_end = priority_to_move
+        self_in_run = False
+        for _, name in run:
+            # If the item being updated is itself in the run, it is being updated to have
+            # a higher priority within the same todo list. The items before it move into the
+            # place it leaves, so the run ends with it
+            if name == item_data["name"]:
+                self_in_run = True
                 break
-            # If the item being updated is itself fetched, it means it is being updated to have a
-            # higher priority within the same todo list. Set it to zero for this update to make room
-            # for the item that will take its place found in the previous pass. The loop can stop
-            # afterwards since no further items will need to be moved
-            if item.name == item_data["name"]:
-                item.priority = (
-                    0  # Will be replaced later when entire record is updated
-                )
-                items_to_save.append(item)
-                break
-            priority_to_move += 1
-            item.priority = priority_to_move
-            items_to_save.append(item)
-        # Since items are increasing in priority, need to save them in reverse order of
-        # priority. Unfortunately, the uniqueness constraint on priority prevents doing a
-        # bulk update
-        items_to_save.reverse()
-        for item in items_to_save:
-            item.save()
-
-
-class ToDoItemMult(generics.ListCreateAPIView, MoveExistingItemsMixin):
+            run_end += 1
+        if run_end == priority_to_move:
+            # Nothing has the priority, or only the item being updated, so nothing moves
+            return
+        if not self_in_run and run_end > ToDoItem.MAX_PRIORITY:
+            # The last item in the run would be moved past the lowest allowed priority
+            raise ValidationError(
+                {
+                    "priority": [
+                        "No room to move the items after this priority, the lowest "
+                        f"priority allowed is {ToDoItem.MAX_PRIORITY}"
+                    ]
+                }
+            )
+
+        now = timezone.now()
+        if run_end == priority_to_move + 1 and not self_in_run:
+            # A single item always moves to an unused priority, so can be moved directly
+            ToDoItem.objects.filter(
+                to_do_list=to_do_list, priority=priority_to_move
+            ).update(priority=F("priority") + 1, updated_at=now)
+            return
+
+        # The uniqueness constraint on priority is checked as each row is updated, so
+        # moving the whole run in one update would clash. First park the run above every
+        # priority in the list, where it can't clash, and then move it back down to one
+        # place lower than where it started. The item being updated stays parked until it
+        # is saved with its new priority. The run is parked starting just above the highest
+        # priority, so no priority goes past the highest plus the length of the run. Both
+        # are at most ToDoItem.MAX_PRIORITY, half of what the field holds, so parked
+        # priorities always fit in the field
+        offset = max_priority - priority_to_move + 1
+        ToDoItem.objects.filter(
+            to_do_list=to_do_list,
+            priority__gte=priority_to_move,
+            priority__lte=run_end if self_in_run else run_end - 1,
+        ).update(priority=F("priority") + offset)
+        ToDoItem.objects.filter(
+            to_do_list=to_do_list, priority__gte=priority_to_move + offset
+        ).exclude(name=item_data["name"]).update(
+            priority=F("priority") - offset + 1, updated_at=now
+        )
+
+
+# pylint: disable-next=too-many-ancestors
+class ToDoItemMult(
+    CachedListMixin,
+    ReadSerializerMixin,
+    TimestampsContextMixin,
+    BulkCreateMixin,
+    generics.ListCreateAPIView,
+    MoveExistingItemsMixin,
+):
     """
     Views for URLs that do not specify a todo item. Use standard behavior
     for all except create
@@ -94,44 +386,66 @@ class ToDoItemMult(generics.ListCreateAPIView, MoveExistingItemsMixin):
 
     queryset = ToDoItem.objects.all()
     serializer_class = ToDoItemSerializer
+    read_serializer_class = ToDoItemReadSerializer
 
     @transaction.atomic
     def perform_create(self, serializer):
         """
-        Create a new todo item, decreasing the priority of other items as needed. Overrides a
+        Create new todo items, decreasing the priority of other items as needed. Overrides a
         method in the base class
         """
 
-        self.move_items_priority_if_needed(serializer.validated_data)
+        items_data = serializer.validated_data
+        if not isinstance(items_data, list):
+            items_data = [items_data]
+        self.move_items_priority_if_needed(items_data)
         return super().perform_create(serializer)
 
 
 # pylint: disable=too-many-ancestors
-class ToDoItemSingle(generics.RetrieveUpdateDestroyAPIView, MoveExistingItemsMixin):
+class ToDoItemSingle(
+    ReadSerializerMixin,
+    TimestampsContextMixin,
+    generics.RetrieveUpdateDestroyAPIView,
+    MoveExistingItemsMixin,
+):
     """Views for URLs that specify a todo item. Use standard behavior for all except update"""
 
     queryset = ToDoItem.objects.all()
     serializer_class = ToDoItemSerializer
+    read_serializer_class = ToDoItemReadSerializer
     lookup_field = "name"
 
-    @transaction.atomic
     def perform_update(self, serializer):
         """
         Perform the requested update of the todo item, moving other item priorities
         to make room if necessary. Overrides a method in the base class
         """
 
+        # Only a change of todo list or priority can require moving other items. Other
+        # updates are a single save, which needs no surrounding transaction
+        if (
+            "to_do_list" not in serializer.validated_data
+            and "priority" not in serializer.validated_data
+        ):
+            return super().perform_update(serializer)
+        return self.perform_update_moving_items(serializer)
+
+    @transaction.atomic
+    def perform_update_moving_items(self, serializer):
+        """
+        Perform an update of the todo item that changes its todo list or priority, moving
+        other item priorities to make room if necessary
+        """
+
         # If the update data has both a todo list and a priority, it can be used to directly
         # do the priority adjustment of other items
         if (
             "to_do_list" in serializer.validated_data
             and "priority" in serializer.validated_data
         ):
-            self.move_items_priority_if_needed(serializer.validated_data)
-        elif (
-            "to_do_list" in serializer.validated_data
-            or "priority" in serializer.validated_data
-        ):
+            self.move_items_priority_if_needed([serializer.validated_data])
+        else:
             # Priority or todo list was changed. Need to adjust priorities based on information
             # in the instance
             instance_data = {
@@ -143,5 +457,5 @@ class ToDoItemSingle(generics.RetrieveUpdateDestroyAPIView, MoveExistingItemsMix
                     "priority", serializer.instance.priority
                 ),
             }
-            self.move_items_priority_if_needed(instance_data)
+            self.move_items_priority_if_needed([instance_data])
         return super().perform_update(serializer)
@@ -31,6 +31,12 @@ DATABASES = {
     "default": env.db(default=f"sqlite:///{BASE_DIR}/todolist.sqlite"),
 }
 
+CACHES = {
+    # Parses os.environ['CACHE_URL'] If not set, uses a per process in memory
+    # cache
+    "default": env.cache(default="locmemcache://"),
+}
+
 ALLOWED_HOSTS = env.list("ALLOWED_HOSTS")
 
 REST_FRAMEWORK = {
@@ -0,0 +1,18 @@
+"""
+Django settings for running the todolistproject unit tests.
+
+These are the project settings, except that the tests run on an in-memory SQLite DB
+whatever DATABASE_URL is set to. The tests never need records to persist outside
+the test run, and the schema is DB agnostic, so this avoids the disk writes of every
+test transaction.
+"""
+
+# pylint: disable=wildcard-import,unused-wildcard-import
+from .settings import *
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
+}